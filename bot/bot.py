@@ -1,21 +1,31 @@
 """Module for Twitch bot and threaded logging."""
 import copy
+import hashlib
 import json
 import logging
+import os
+import threading
 import time
 import traceback
+import tracemalloc
 from collections import defaultdict
 
-import requests
 from requests import RequestException
+from twisted.internet import defer
 
 import bot.commands
 import bot.emotecounter
 import bot.ranking
 from bot.error_classes import UserNotFoundError
+from bot.utilities.cardrepository import getRepository as getCardRepository
+from bot.utilities.emoteindex import EmoteIndex
+from bot.utilities.httpclient import client
+from bot.utilities.outbound import PRIORITY_MODERATION, PRIORITY_WHISPER
 from bot.utilities.permission import Permission
-from bot.utilities.tools import formatEmoteList, sanitizeUserName
-from bot.utilities.webcache import WebCache
+from bot.utilities.template import Template, compileResponses
+from bot.utilities.tools import formatEmoteList, sanitizeUserName, timed
+from bot.utilities.vocabulary import vocabulary
+from bot.utilities.webcache import shared as sharedCache
 
 from bot.paths import (TRUSTED_MODS_PATH, IGNORED_USERS_PATH, PRONOUNS_PATH, CONFIG_PATH, CUSTOM_RESPONSES_PATH,
                        TEMPLATE_RESPONSES_PATH)
@@ -24,6 +34,74 @@ from bot.paths import (USERLIST_API, CHANNEL_BTTVEMOTES_API, USER_NAME_API, USER
 
 DEFAULT_RAID_ANNOUNCE_THRESHOLD = 15
 CACHE_DURATION = 10800
+STATIC_CACHE_DURATION = 86400   # 1 day, for lists which hardly ever change
+
+
+def parseGlobalTwitchEmotes(emoteJson):
+    """Return the global twitch emotes of an emoticon_images json."""
+    result = []
+    for emote in formatEmoteList(emoteJson['emoticon_sets']['0']):
+        if ('\\') not in emote:
+            # print("Simple single word twitch emote", emote)
+            result.append(emote)
+        else:
+            # They are all regex, for example :p, :P, :-p, :-P have the same id of 12, there are many ways to input this emote
+            # print("Complex twitch emotes that we can't handle", emote)
+            pass
+    return result
+
+
+def parseGlobalBttvEmotes(emoteJson):
+    """Return the emotes of a bttv json."""
+    return formatEmoteList(emoteJson['emotes'])
+
+
+def parseEmojis(emojis_json):
+    """Return the emojis of a gemoji json."""
+    emojis = []
+    for e in emojis_json:
+        try:
+            emojis.append(e['emoji'])
+        except KeyError:
+            pass    # No Emoji found.
+    return emojis
+
+
+# Data every bot uses: (url, function, duration)
+GLOBAL_DATA = [
+    (TWITCH_EMOTE_API, parseGlobalTwitchEmotes, CACHE_DURATION),
+    (GLOBAL_BTTVEMOTES_API, parseGlobalBttvEmotes, CACHE_DURATION),
+    (HEARTHSTONE_CARD_API, None, STATIC_CACHE_DURATION),
+    (EMOJI_API, parseEmojis, STATIC_CACHE_DURATION),
+]
+
+
+# Maps path -> (modification time, content) of template responses files
+templateResponses = {}
+templateResponsesLock = threading.Lock()
+
+
+def loadTemplateResponses(path=TEMPLATE_RESPONSES_PATH):
+    """Return the template responses, read only once per process and again when the file changes.
+
+    All bots share the returned dictionary, it must not be modified.
+    """
+    with templateResponsesLock:
+        mtime = os.stat(path).st_mtime_ns
+        cached = templateResponses.get(path)
+        if cached is None or cached[0] != mtime:
+            with open(path, 'r', encoding="utf-8") as file:
+                cached = (mtime, json.load(file))
+            templateResponses[path] = cached
+        return cached[1]
+
+
+def prefetchGlobalData(pool):
+    """Load the data every bot uses into the shared cache, using the executor pool.
+
+    Return the futures of the loads.
+    """
+    return [pool.submit(sharedCache.get, url, function, [], duration) for (url, function, duration) in GLOBAL_DATA]
 
 
 class TwitchBot():
@@ -32,7 +110,8 @@ class TwitchBot():
     def __init__(self, root):
         """Initialize bot."""
         self.root = root
-        self.cache = WebCache(duration=CACHE_DURATION)  # 3 hours
+        self.cache = sharedCache.namespace(root, duration=CACHE_DURATION)  # 3 hours
+        self.emoteIndex = None
         # other instance variables
         self.trusted_mods_path = TRUSTED_MODS_PATH
         self.pronouns_path = PRONOUNS_PATH
@@ -48,27 +127,39 @@ class TwitchBot():
         # Currently value is given in signedOn() in multibot_irc_cilent
         # self.irc = None
 
+        # Seconds spent in each phase of the constructor, for the startup report
+        self.startupTimes = {}
+        # Maps command class name -> (seconds, bytes) of its last instantiation
+        self.commandProfile = {}
+        # Maps command class -> inputs it was created with, see getCommandInputs()
+        self.commandInputs = {}
+
         # user cache related:
         self.setupCache()
 
-        self.reloadConfig(firstRun=True)
+        with timed(self.startupTimes, "config"):
+            self.reloadConfig(firstRun=True)
 
         # Initialize emote counter
-        self.ecount = bot.emotecounter.EmoteCounterForBot(self)
-        self.ecount.startCPM()
-        self.ranking = bot.ranking.Ranking(self)
+        with timed(self.startupTimes, "emotecounter"):
+            self.ecount = bot.emotecounter.EmoteCounterForBot(self)
+            self.ecount.startCPM()
+        with timed(self.startupTimes, "ranking"):
+            self.ranking = bot.ranking.Ranking(self)
 
         # Get user list, seems better not to cache
-        url = USERLIST_API.format(self.channel[1:])
-        data = requests.get(url).json()
-        self.users = set(sum(data['chatters'].values(), []))
+        with timed(self.startupTimes, "userlist"):
+            url = USERLIST_API.format(self.channel[1:])
+            data = client.getJSON(url)
+            self.users = set(sum(data['chatters'].values(), []))
         self.mods = set()
         self.subs = set()
 
         # some commands needs data to be completed loaded, but they are not available
         # yet in reloadConfig(). So we have to reload commands here ... not sure if this is good
         # practice or not
-        self.reload_commands()
+        with timed(self.startupTimes, "commands"):
+            self.reload_commands()
     
     def getChannelFFZEmotes(self):
         """Return FFZ emotes for this channel."""
@@ -89,45 +180,45 @@ class TwitchBot():
 
     def getGlobalTwitchEmotes(self):
         """Return available global twitch emotes."""
-        def f(emoteJson):
-            result = []
-            for emote in formatEmoteList(emoteJson['emoticon_sets']['0']):
-                if ('\\') not in emote:
-                    # print("Simple single word twitch emote", emote)
-                    result.append(emote)
-                else:
-                    # They are all regex, for example :p, :P, :-p, :-P have the same id of 12, there are many ways to input this emote
-                    # print("Complex twitch emotes that we can't handle", emote)
-                    pass
-            return result
-        return self.cache.get(TWITCH_EMOTE_API, f, fallback=[])
+        return self.cache.get(TWITCH_EMOTE_API, parseGlobalTwitchEmotes, fallback=[])
 
     def getGlobalBttvEmotes(self):
         """Return available global bttv emotes."""
-        def f(emoteJson):
-            return formatEmoteList(emoteJson['emotes'])
-        return self.cache.get(GLOBAL_BTTVEMOTES_API, f, fallback=[])
+        return self.cache.get(GLOBAL_BTTVEMOTES_API, parseGlobalBttvEmotes, fallback=[])
 
     def getEmotes(self):
         """Return all emotes which can be used by all users on this channel."""
         return self.getChannelBTTVEmotes() + self.getGlobalTwitchEmotes() \
             + self.getGlobalBttvEmotes() + self.getChannelFFZEmotes()
 
+    def getEmoteIndex(self):
+        """Return an index over all emotes and emojis, rebuilt only when the cached emote lists change."""
+        if self.emoteIndex is None or not self.emoteIndex.isValid(self.cache):
+            # Sets of the shared lists are shared by all bots, only the channel ones are built per bot
+            urls = [TWITCH_EMOTE_API, CHANNEL_BTTVEMOTES_API.format(self.channel[1:]), GLOBAL_BTTVEMOTES_API,
+                    FFZ_API.format(self.channel[1:]), EMOJI_API]
+            twitch = vocabulary.setOf(urls[0], self.getGlobalTwitchEmotes())
+            bttv = (vocabulary.setOf(urls[1], self.getChannelBTTVEmotes()) |
+                    vocabulary.setOf(urls[2], self.getGlobalBttvEmotes()))
+            ffz = vocabulary.setOf(urls[3], self.getChannelFFZEmotes())
+            emojis = vocabulary.setOf(urls[4], self.getEmojis())
+
+            expires = min(self.cache.expiresAt(url) for url in urls)
+            self.emoteIndex = EmoteIndex(twitch, bttv, ffz, emojis, cache=self.cache, version=self.cache.version,
+                                         expires=expires)
+        return self.emoteIndex
+
     def getHearthstoneCards(self):
         """Return all Hearthstone cards."""
-        return self.cache.get(HEARTHSTONE_CARD_API, fallback=[])
+        return self.cache.get(HEARTHSTONE_CARD_API, fallback=[], duration=STATIC_CACHE_DURATION)
+
+    def getHearthstoneCardRepository(self):
+        """Return all Hearthstone cards, indexed by name and type."""
+        return getCardRepository(self.getHearthstoneCards())
 
     def getEmojis(self):
         """Return all available emojis."""
-        def f(emojis_json):
-            emojis = []
-            for e in emojis_json:
-                try:
-                    emojis.append(e['emoji'])
-                except KeyError:
-                    pass    # No Emoji found.
-            return emojis
-        return self.cache.get(EMOJI_API, f, fallback=[])
+        return self.cache.get(EMOJI_API, parseEmojis, fallback=[], duration=STATIC_CACHE_DURATION)
 
     def setConfig(self, config):
         """Write the config file and reload."""
@@ -155,9 +246,8 @@ class TwitchBot():
         with open(PRONOUNS_PATH.format(self.root), encoding="utf-8") as fp:
             self.pronouns = json.load(fp)
 
-        # load template responses first
-        with open(TEMPLATE_RESPONSES_PATH, 'r', encoding="utf-8") as file:
-            RESPONSES = json.load(file)
+        # load template responses first, they are shared by all bots and must not be modified
+        RESPONSES = loadTemplateResponses()
 
         # load custom responses
         try:
@@ -188,7 +278,11 @@ class TwitchBot():
             'Authorization': self.password
         }
 
+        oldChannel = getattr(self, "channel", None)
         self.channel = "#" + str(CONFIG['channel'])
+        if oldChannel is not None and oldChannel != self.channel and getattr(self, "irc", None) is not None:
+            # The irc client routes messages by channel
+            self.irc.updateChannels()
         self.channelID = self.getuserID(str(CONFIG['channel']))
         self.pleb_cooldowntime = CONFIG["pleb_cooldown"]  # time between non-sub commands
         self.pleb_gametimer = CONFIG["pleb_gametimer"]  # time between pleb games
@@ -196,6 +290,7 @@ class TwitchBot():
         self.last_plebgame = time.time() - self.pleb_gametimer
         self.config = CONFIG
         self.responses = RESPONSES
+        self.templates = compileResponses(RESPONSES)
         self.KAPPAGAMEP = CONFIG["points"]["kappa_game"]
         self.EMOTEGAMEEMOTES = CONFIG["EmoteGame"]
         self.EMOTEGAMEP = CONFIG["points"]["emote_game"]
@@ -274,20 +369,21 @@ class TwitchBot():
         return Permission.User
 
     def select_commands(self, perm):
-        """If a game is active and plebcommands on cooldown, only iterate through game list.
+        """Return the dispatcher of the commands that may be executed.
 
+        If a game is active and plebcommands on cooldown, only iterate through game list.
         If no game is active only allow 'passive games' a.k.a PyramidGame
         """
         if perm == 0:
             if (time.time() - self.last_plebcmd < self.pleb_cooldowntime):
                 if self.gameRunning:
-                    return self.games
+                    return self.gameDispatcher
                 else:
-                    return self.passivegames
+                    return self.passivegameDispatcher
             else:
-                return self.commands
+                return self.commandDispatcher
         else:
-            return self.commands
+            return self.commandDispatcher
 
     def process_command(self, user, msg, tag_info):
         """Process messages and call commands."""
@@ -310,12 +406,12 @@ class TwitchBot():
         self.ecount.processMessage(msg)
 
         """Limit pleb bot spam. Only allow certain commands to be processed by plebs, if plebcmds on cooldown."""
-        cmdlist = self.select_commands(perm)
+        dispatcher = self.select_commands(perm)
 
-        # Flip through commands and execute everyone that matches.
+        # Flip through the commands which could react to the message and execute everyone that matches.
         # Check if user has permission to execute command.
         # Also reduce warning message spam by limiting it to one per minute.
-        for cmd in cmdlist:
+        for cmd in dispatcher.candidates(msg):
             try:
                 match = cmd.match(self, user, msg, tag_info)
                 if not match:
@@ -431,26 +527,34 @@ class TwitchBot():
                 logging.error(traceback.format_exc())
 
     def reload_commands(self):
-        """Reload commands."""
-        logging.warning("Reloading commands")
+        """Reload commands.
 
-        # Reload commands
-        self.close_commands()
+        Only commands whose declared inputs (config keys, responses, data files, web data)
+        changed since they were created are closed and created again, the others keep their state.
+        """
+        start = time.perf_counter()
 
         self.games = []
         self.passivegames = []
 
+        reloaded = []
         if self.commands == []:
             for cmd in bot.commands.commands:
-                self.commands.append(cmd(self))
+                self.commands.append(self.createCommand(cmd))
+                reloaded.append(cmd.__name__)
         else:
             for i, cmd in enumerate(self.commands):
                 reloadable = True
                 for non_reloadable_class in bot.commands.non_reload:
                     if cmd.__class__ == non_reloadable_class:
                         reloadable = False
-                if reloadable:
-                    self.commands[i] = cmd.__class__(self)
+                if reloadable and self.getCommandInputs(cmd.__class__) != self.commandInputs.get(cmd.__class__):
+                    try:
+                        cmd.close(self)
+                    except (TypeError, ValueError):  # Not sure which Errors might happen here.
+                        logging.error(traceback.format_exc())
+                    self.commands[i] = self.createCommand(cmd.__class__)
+                    reloaded.append(cmd.__class__.__name__)
 
         for cmd in self.commands:
             if cmd.__class__ in bot.commands.games:
@@ -458,6 +562,47 @@ class TwitchBot():
             if cmd.__class__ in bot.commands.passivegames:
                 self.passivegames.append(cmd)
 
+        self.commandDispatcher = bot.commands.CommandDispatcher(self.commands)
+        self.gameDispatcher = bot.commands.CommandDispatcher(self.games)
+        self.passivegameDispatcher = bot.commands.CommandDispatcher(self.passivegames)
+
+        logging.warning("Reloaded {} of {} commands of {} in {:.1f}ms: {}".format(
+            len(reloaded), len(self.commands), self.root, (time.perf_counter() - start) * 1000,
+            ", ".join(reloaded) or "none"))
+
+    def getCommandInputs(self, cls):
+        """Return a snapshot of everything the command class cls reads when it is created."""
+        config = tuple(copy.deepcopy(self.config.get(key)) for key in cls.configKeys)
+        responses = tuple(copy.deepcopy(self.responses.get(key)) for key in cls.responseKeys)
+        files = tuple(self.getFileDigest(path.format(self.root)) for path in cls.dataFiles)
+        web = self.cache.version if cls.webData else None
+        return (config, responses, files, web)
+
+    def getFileDigest(self, path):
+        """Return a hash of the content of a file, None if it can't be read."""
+        try:
+            with open(path, 'rb') as file:
+                return hashlib.sha1(file.read()).hexdigest()
+        except OSError:
+            return None
+
+    def createCommand(self, cls):
+        """Instantiate a command and record its init time and memory in commandProfile.
+
+        Memory is only measured while tracemalloc is tracing (python -X tracemalloc), it is
+        approximate when several bots are started at the same time.
+        """
+        tracing = tracemalloc.is_tracing()
+        memory = tracemalloc.get_traced_memory()[0] if tracing else 0
+        start = time.perf_counter()
+        inputs = self.getCommandInputs(cls)
+        cmd = cls(self)
+        self.commandInputs[cls] = inputs
+        seconds = time.perf_counter() - start
+        memory = tracemalloc.get_traced_memory()[0] - memory if tracing else None
+        self.commandProfile[cls.__name__] = (seconds, memory)
+        return cmd
+
     def reload(self):
         """Reload bot."""
         logging.warning("Reloading bot!")
@@ -466,6 +611,8 @@ class TwitchBot():
     def terminate(self):
         """Terminate bot."""
         self.close_commands()
+        self.ecount.close()
+        self.ranking.close()
 
     def displayName(self, username):
         """Get the proper capitalization of a twitch user."""
@@ -478,12 +625,38 @@ class TwitchBot():
                 logging.info("User data not in cache when trying to access user display name, user tag is {}".format(username))
                 name = self.getuserTag(u_name)["users"][0]["display_name"]
                 # save the record as well
-                self.userNametoDisplayName[username] = name
+                self.userNametoDisplayName[u_name] = name
                 return name
             except (RequestException, IndexError, KeyError):
                 logging.info("Cannot get user info from API call, have to return username directly")
                 return username
 
+    def displayNameAsync(self, username):
+        """Return a Deferred firing with the proper capitalization of a twitch user.
+
+        Fires immediately on cache hits, falls back to the username if the API call fails.
+        """
+        u_name = sanitizeUserName(username)
+
+        if u_name in self.userNametoDisplayName:
+            return defer.succeed(self.userNametoDisplayName[u_name])
+
+        def found(data):
+            name = data["users"][0]["display_name"]
+            self.userNametoDisplayName[u_name] = name
+            return name
+
+        def notFound(failure):
+            failure.trap(RequestException, IndexError, KeyError, ValueError)
+            logging.info("Cannot get user info from API call, have to return username directly")
+            return username
+
+        logging.info("User data not in cache when trying to access user display name, user tag is {}".format(username))
+        d = self.getJSONObjectFromTwitchAPIAsync(USER_NAME_API.format(u_name))
+        d.addCallback(found)
+        d.addErrback(notFound)
+        return d
+
     def setupCache(self):
         """Setup a user cache."""
         # We get these user data from userState(), or API calls
@@ -500,23 +673,24 @@ class TwitchBot():
         self.displayNameToUserName[display_name] = login_id
 
     def getJSONObjectFromTwitchAPI(self, url):
-        """Get and handle JSON object from Twitch API."""
+        """Get and handle JSON object from Twitch API.
+
+        Blocks until the answer arrives, use getJSONObjectFromTwitchAPIAsync() while the reactor runs.
+        """
         try:
-            r = requests.get(url, headers=self.TWITCH_API_COMMON_HEADERS)
-            r.raise_for_status()
-            return r.json()
+            return client.getJSON(url, headers=self.TWITCH_API_COMMON_HEADERS)
 
         except RequestException as e:
-            # 4xx/5xx errors from server
-
-            msg = "Twitch server-side error, URL sent is {}, status code is {}".format(url, r.status_code)
-            msg += "\nError message from twitch's JSON {} ".format(r.json())
-            raise RequestException(msg)
+            # 4xx/5xx errors from server, or no connection at all
+            raise RequestException("Twitch API error, URL sent is {}: {}".format(url, e))
 
         except ValueError as e:
             # likely can't parse JSON
-            msg = "Error in getting user JSON with URL {}, status code is {}".format(url, r.status_code)
-            raise ValueError(msg)
+            raise ValueError("Error in getting user JSON with URL {}: {}".format(url, e))
+
+    def getJSONObjectFromTwitchAPIAsync(self, url):
+        """Return a Deferred firing with the JSON object from Twitch API, without blocking the reactor."""
+        return client.getJSONAsync(url, headers=self.TWITCH_API_COMMON_HEADERS)
 
     def getUserDataFromID(self, user_id):
         """Get Twitch user data of a given id."""
@@ -562,6 +736,32 @@ class TwitchBot():
                 logging.info("Seems no such user as {}".format(username))
                 raise UserNotFoundError("No user with login id of {}".format(username))
 
+    def getuserIDAsync(self, username):
+        """Return a Deferred firing with the twitch id (numbers) of username, without blocking the reactor.
+
+        Fails with UserNotFoundError if there is no such user, like getuserID().
+        """
+        u_name = sanitizeUserName(username)
+
+        if u_name in self.userNametoID:
+            return defer.succeed(self.userNametoID[u_name])
+
+        def found(data):
+            id = data["users"][0]["_id"]
+            self.updateCacheData(u_name, data["users"][0]["display_name"], id)
+            return id
+
+        def notFound(failure):
+            failure.trap(IndexError, RequestException)
+            logging.info("Seems no such user as {}".format(username))
+            raise UserNotFoundError("No user with login id of {}".format(username))
+
+        logging.info("User data not in cache when trying to access user ID. User tag {}".format(username))
+        d = self.getJSONObjectFromTwitchAPIAsync(USER_NAME_API.format(u_name))
+        d.addCallback(found)
+        d.addErrback(notFound)
+        return d
+
     def getuserEmotes(self, userID):
         """Get the emotes a user can use from userID without the global emoticons."""
         url = USER_EMOTE_API.format(userID)
@@ -614,31 +814,48 @@ class TwitchBot():
             logging.error(traceback.format_exc())
             print("Stream object could not be fetched.")
 
+    def getStreamAsync(self, channelID):
+        """Return a Deferred firing with the stream object of channelID."""
+        return self.getJSONObjectFromTwitchAPIAsync(STREAMS_API.format(channelID))
+
     def getDisplayNameFromID(self, user_id):
         """Convert user id to display name."""
-        if user_id in self.IDtoDisplayName:
-            return self.IDtoDisplayName[id]
+        # ids from the database are integers, the cache uses the strings from the IRC tags
+        if str(user_id) in self.IDtoDisplayName:
+            return self.IDtoDisplayName[str(user_id)]
         else:
             data = self.getUserDataFromID(user_id)
             return data["display_name"]
 
+    def getDisplayNameFromIDAsync(self, user_id):
+        """Return a Deferred firing with the display name of a user id.
+
+        Fails with RequestException if there is no such user (anymore).
+        """
+        if str(user_id) in self.IDtoDisplayName:
+            return defer.succeed(self.IDtoDisplayName[str(user_id)])
+
+        def found(data):
+            self.updateCacheData(sanitizeUserName(data["name"]), data["display_name"], data["_id"])
+            return data["display_name"]
+
+        d = self.getJSONObjectFromTwitchAPIAsync(USER_ID_API.format(user_id))
+        d.addCallback(found)
+        return d
+
     def setlast_plebgame(self, last_plebgame):
         """Set timer of last_plebgame."""
         self.last_plebgame = last_plebgame
 
     def replace_vars(self, msg, args):
-        """Replace the variables in the message."""
-        oldmsg = msg
-        newmsg = msg
-
-        for key in args:
-            newmsg = newmsg.replace(key, str(args[key]))
-            """Check if something was replaced, otherwise something went wrong."""
-            if newmsg is oldmsg:
-                print("ERROR: Could not replace variable in string!")
+        """Replace the variables in the message.
 
-            oldmsg = newmsg
-        return newmsg
+        Messages from the responses are compiled in reloadConfig(), other messages are compiled here.
+        """
+        template = self.templates.get(msg)
+        if template is None:
+            template = Template(msg)
+        return template.render(args)
 
     def deepMergeDict(self, base, custom, dictPath=""):
         """Intended to merge dictionaries created from JSON.load().
@@ -650,24 +867,28 @@ class TwitchBot():
         - if BOTH custom[key] and base[key] exist, but their type is same ...
           - if both are dictionary, merge recursively
           - else use custom[key]
+
+        Neither base nor custom are modified. Only dictionaries on the path to a custom entry
+        are copied, everything else in the result is shared with base and custom.
         """
+        merged = dict(base)
         for k in custom.keys():
-            if k not in base.keys():
+            if k not in base:
                 # entry in custom but not base, append it
-                base[k] = custom[k]
+                merged[k] = custom[k]
             else:
-                dictPath += "[{}]".format(k)
+                keyPath = dictPath + "[{}]".format(k)
                 if type(base[k]) != type(custom[k]): # noqa - intended, we check for same type
-                    raise TypeError("Different type of data found on merging key{}".format(dictPath))
+                    raise TypeError("Different type of data found on merging key{}".format(keyPath))
                 else:
                     # Have same key and same type of data
                     # Do recursive merge for dictionary
                     if isinstance(custom[k], dict):
-                        base[k] = self.deepMergeDict(base[k], custom[k], dictPath)
+                        merged[k] = self.deepMergeDict(base[k], custom[k], keyPath)
                     else:
-                        base[k] = custom[k]
+                        merged[k] = custom[k]
 
-        return copy.deepcopy(base)
+        return merged
 
     def dumpIgnoredUsersFile(self):
         """Output ignored users file."""
@@ -676,7 +897,7 @@ class TwitchBot():
 
     def clearCache(self):
         """Clear the cache."""
-        self.cache = WebCache(duration=CACHE_DURATION)
+        self.cache.clear()
         self.reload_commands()
 
     def write(self, msg):
@@ -692,7 +913,7 @@ class TwitchBot():
         """Whisper a message to a user."""
         whisper = "/w {} {}".format(user, msg)
         if self.irc is not None:
-            self.irc.write(self.channel, whisper)
+            self.irc.write(self.channel, whisper, PRIORITY_WHISPER)
         else:
             logging.warning("The bot {} in channel {} wanted to whisper to {}, but irc isn't set.".format(self.nickname, self.channel, user))
 
@@ -700,7 +921,7 @@ class TwitchBot():
         """Timout a user for a certain time in the channel."""
         timeout = "/timeout {} {}".format(user, time)
         if self.irc is not None:
-            self.irc.write(self.channel, timeout)
+            self.irc.write(self.channel, timeout, PRIORITY_MODERATION)
         else:
             logging.warning("The bot {} in channel {} wanted to timout {}, but irc isn't set.".format(self.nickname, self.channel, user))
 
@@ -708,7 +929,7 @@ class TwitchBot():
         """Ban a user from the channel."""
         ban = "/ban {}".format(user)
         if self.irc is not None:
-            self.irc.write(self.channel, ban)
+            self.irc.write(self.channel, ban, PRIORITY_MODERATION)
         else:
             logging.warning("The bot {} in channel {} wanted to ban {}, but irc isn't set.".format(self.nickname, self.channel, user))
 
@@ -716,6 +937,6 @@ class TwitchBot():
         """Unban a user for the channel."""
         unban = "/unban {}".format(user)
         if self.irc is not None:
-            self.irc.write(self.channel, unban)
+            self.irc.write(self.channel, unban, PRIORITY_MODERATION)
         else:
             logging.warning("The bot {} in channel {} wanted to unban {}, but irc isn't set.".format(self.nickname, self.channel, user))
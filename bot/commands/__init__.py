@@ -5,6 +5,9 @@ activeGames: Commands that should always react (no cooldown), except when anothe
 passiveGames: Commands that should always react (no cooldown)
 games: activeGames + passiveGames
 commands: all commands
+
+CommandDispatcher selects the commands of such a list which could react to a message,
+based on the triggers the commands declare.
 """
 
 from .active import Active
@@ -13,6 +16,7 @@ from .banme import BanMe
 from .cache import Cache
 from .calculator import Calculator
 from .cardinfo import CardInfo
+from .dispatcher import CommandDispatcher
 from .editcommandlist import EditCommandList
 from .editcommandmods import EditCommandMods
 from .editquotelist import editQuoteList
@@ -7,6 +7,7 @@ class Active(Command):
     """Get active users."""
 
     perm = Permission.User
+    triggers = ["!active"]
     responses = {}
 
     def __init__(self, bot):
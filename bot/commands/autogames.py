@@ -12,6 +12,7 @@ class AutoGames(Command):
     """Start games randomly."""
 
     perm = Permission.Moderator
+    triggers = ["!games on", "!games off"]
 
     def __init__(self, bot):
         """Initialize variables."""
@@ -8,6 +8,7 @@ class Cache(Command):
     """Allows admins and trusted mods to manage the cache of the bot."""
 
     perm = Permission.Moderator
+    triggers = ["!clearcache"]
 
     def __init__(self, bot):
         """Initialize variables."""
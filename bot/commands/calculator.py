@@ -17,6 +17,7 @@ class Calculator(Command):
     """
 
     perm = Permission.User
+    triggers = ["!calc "]
 
     symbols = ["e", "pi", "sin", "cos", "tan", "abs", "trunc", "round", "sgn"]
 
@@ -1,9 +1,9 @@
 """Commands: "[<hearthstone card name>]"."""
 import re
+from collections import Counter
 
 from bot.commands.command import Command
 from bot.utilities.permission import Permission
-from bot.utilities.spellcorrection import SpellCorrection
 
 
 class CardInfo(Command):
@@ -13,14 +13,14 @@ class CardInfo(Command):
     """
 
     perm = Permission.User
+    triggers = ["["]
 
     def __init__(self, bot):
-        """Initialize spell correction."""
-        cards = bot.getHearthstoneCards()
-        cardNames = []
-        for i in range(0, len(cards)):
-            cardNames.append(cards[i]["name"].lower())
-        self.spellcorrection = SpellCorrection(set(cardNames))
+        """Initialize variables.
+
+        Of equally close corrections, the card looked up most often in the channel wins.
+        """
+        self.lookups = Counter()
 
     def match(self, bot, user, msg, tag_info):
         """Match if message is inside [] and message length < 30."""
@@ -29,17 +29,12 @@ class CardInfo(Command):
     def run(self, bot, user, msg, tag_info):
         """Print out information about a card."""
         name = msg[1:-1]  # strips [,]
-        if name not in bot.getHearthstoneCards():
-            name = self.spellcorrection.spell(name)
-            if not name:
-                bot.write("@{} I can't find that card, sorry.".format(user))
-                return
-            else:
-                for c in bot.getHearthstoneCards():
-                    if c['name'].lower() == name:
-                        card = c
-        else:
-            card = bot.getHearthstoneCards()[name]
+        card = bot.getHearthstoneCardRepository().find(name, self.lookups)
+        if card is None:
+            bot.write("@{} I can't find that card, sorry.".format(user))
+            return
+
+        self.lookups[card['name'].lower()] += 1
 
         # Remove formatting and weird [x] I don't know the meaning of
         if 'text' in card:
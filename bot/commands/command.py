@@ -7,10 +7,26 @@ class Command(object):
 
     perm = Permission.Admin
 
+    # Lowercase prefixes a message has to start with for match() to be able to return True.
+    # None means match() gets checked for every message.
+    triggers = None
+
+    # What __init__ reads. On a reload, a command is only created again if one of these changed:
+    # keys of bot.config and bot.responses, data file paths from bot.paths (formatted with
+    # bot.root), and whether the web cache content is used.
+    configKeys = ()
+    responseKeys = ()
+    dataFiles = ()
+    webData = False
+
     def __init__(self, bot):
         """Initialize the command."""
         pass
 
+    def listening(self):
+        """Return whether match() has to be checked for every message, regardless of the triggers."""
+        return self.triggers is None
+
     def match(self, bot, user, msg, tag_info):
         """Return whether this command should be run."""
         return False
@@ -0,0 +1,60 @@
+"""Contains the dispatcher which selects the commands that could react to a message."""
+from bot.commands.command import Command
+
+MATCHES = ""    # key for the commands ending in a trie node, no single character can collide with it
+
+
+class CommandDispatcher(object):
+    """Index over a list of commands, based on the triggers they declare.
+
+    Instead of calling match() of every command, only commands with a trigger the message
+    starts with, commands without triggers and currently listening commands (e.g. a running game)
+    are returned. The order of the command list is kept.
+    """
+
+    def __init__(self, commands):
+        """Build the trigger index for a list of commands."""
+        self.commands = commands
+        self.always = []        # positions of commands without triggers
+        self.listeners = []     # positions of commands which may listen to every message temporarily
+        self.trie = {}
+        self.depth = 0
+
+        for i, cmd in enumerate(commands):
+            if cmd.triggers is None:
+                self.always.append(i)
+                continue
+
+            if type(cmd).listening is not Command.listening:
+                self.listeners.append(i)
+
+            for trigger in cmd.triggers:
+                trigger = trigger.lower()
+                node = self.trie
+                for ch in trigger:
+                    node = node.setdefault(ch, {})
+                node.setdefault(MATCHES, []).append(i)
+                self.depth = max(self.depth, len(trigger))
+
+    def candidates(self, msg):
+        """Yield the commands whose match() has to be checked for msg, in order of the command list.
+
+        Commands are looked up in the list while yielding, so commands replaced by a reload during
+        the iteration are picked up, like when iterating the list directly.
+        """
+        positions = set(self.always)
+
+        for i in self.listeners:
+            if self.commands[i].listening():
+                positions.add(i)
+
+        node = self.trie
+        positions.update(node.get(MATCHES, ()))
+        for ch in msg[:self.depth].lower():
+            node = node.get(ch)
+            if node is None:
+                break
+            positions.update(node.get(MATCHES, ()))
+
+        for i in sorted(positions):
+            yield self.commands[i]
@@ -13,6 +13,8 @@ class EditCommandList(Command):
     """
 
     perm = Permission.Moderator
+    triggers = ["!addcommand ", "!delcommand ", "!replylist"]
+    dataFiles = [REPLIES_FILE]
 
     def __init__(self, bot):
         """Load command list."""
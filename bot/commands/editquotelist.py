@@ -10,6 +10,8 @@ class editQuoteList(Command):
     """Add or delete quote from a json-file."""
 
     perm = Permission.Moderator
+    triggers = ["!addquote ", "!delquote "]
+    dataFiles = [QUOTES_FILE]
 
     def __init__(self, bot):
         """Load command list."""
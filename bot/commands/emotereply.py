@@ -11,6 +11,7 @@ class EmoteReply(Command):
     """
 
     perm = Permission.User
+    triggers = ["!call ", "!any ", "!word "]
 
     """Maximum word/character values so chat doesnt explode."""
     maxwords = [12, 15, 1]  # [call, any, word]
@@ -40,7 +41,8 @@ class EmoteReply(Command):
             parse = msg.split(' ', 2)
             self.cmd = parse[0].strip()
             self.emote = parse[1].strip()
-            if (self.emote in bot.getEmotes() or self.emote in bot.getEmojis()):
+            emoteIndex = bot.getEmoteIndex()
+            if (self.emote in emoteIndex.emotes or self.emote in emoteIndex.emojis):
                 try:
                     self.text = parse[2].strip()
                 except IndexError:
@@ -1,4 +1,5 @@
 """Commands: "!estart", "!rngestart"."""
+import logging
 import random
 
 from bot.commands.command import Command
@@ -16,6 +17,7 @@ class GuessEmoteGame(Command):
     """
 
     perm = Permission.User
+    triggers = ["!estart", "!rngestart"]
 
     def __init__(self, bot):
         """Initialize variables."""
@@ -30,35 +32,27 @@ class GuessEmoteGame(Command):
 
         if 'rng' in msg.lower():
             """Get all twitch- and BTTV-Emotes, assemble a list of random emotes."""
-            twitchemotes = bot.getGlobalTwitchEmotes()
-            bttvemotes = bot.getChannelBTTVEmotes() + bot.getGlobalBttvEmotes()
+            emoteIndex = bot.getEmoteIndex()
 
             n_total = 25
             n_bttv = 10
 
-            i = 0
-            while i < (n_total-n_bttv):
-                rng_emote = random.choice(twitchemotes)
-
-                if rng_emote not in emotelist:
-                    emotelist.append(rng_emote)
-                    i += 1
-
-            i = 0
-            while i < n_bttv:
-                rng_emote = random.choice(bttvemotes)
-
-                if rng_emote not in emotelist:
-                    emotelist.append(rng_emote)
-                    i += 1
+            twitchemotes = list(emoteIndex.twitch)
+            emotelist = random.sample(twitchemotes, min(n_total - n_bttv, len(twitchemotes)))
+            bttvemotes = [emote for emote in emoteIndex.bttv if emote not in emotelist]
+            emotelist += random.sample(bttvemotes, min(n_bttv, len(bttvemotes)))
         else:
             """Get emotes from config-file."""
             emotelist = bot.EMOTEGAMEEMOTES
 
-        """Shuffle list and choose a winning emote."""
+        """Shuffle list and choose a winning emote, None if there are no emotes."""
         random.shuffle(emotelist)
         self.emotes = emotelist
-        self.emote = random.choice(emotelist)
+        self.emote = random.choice(emotelist) if emotelist else None
+
+    def listening(self):
+        """Listen to every message while the game is running."""
+        return self.active
 
     def match(self, bot, user, msg, tag_info):
         """Match if the game is active or gets started with !estart."""
@@ -72,6 +66,11 @@ class GuessEmoteGame(Command):
         if not self.active:
             self.active = True
             self.initGame(bot, msg)
+            if self.emote is None:
+                logging.warning("No emotes for the emote game, the emote lists may have failed to load.")
+                bot.write(self.responses["no_emotes"]["msg"])
+                self.close(bot)
+                return
             print("Right emote: " + self.emote)
             var = {"<MULTIEMOTES>": EmoteListToString(self.emotes)}
             bot.write(bot.replace_vars(self.responses["start_msg"]["msg"], var))
@@ -1,4 +1,5 @@
 """Commands: "!mstart", "!mstop"."""
+import logging
 import random
 
 from twisted.internet import reactor
@@ -17,6 +18,7 @@ class GuessMinionGame(Command):
     """
 
     perm = Permission.User
+    triggers = ["!mstart"]
 
     def __init__(self, bot):
         """Initialize variables."""
@@ -74,12 +76,13 @@ class GuessMinionGame(Command):
 
     def initGame(self, bot):
         """Initialize GuessMinionGame."""
-        self.attributes = ['cardClass', 'set', 'name', 'rarity', 'attack', 'cost', 'health']
-        nominion = True
-        while nominion:
-            self.minion = random.choice(bot.getHearthstoneCards())
-            if self.minion['type'] == 'MINION':
-                nominion = False
+        cards = bot.getHearthstoneCardRepository()
+        self.minion = cards.randomMinion()
+        self.attributes = list(cards.clues[self.minion['name']]) if self.minion is not None else []
+
+    def listening(self):
+        """Listen to every message while the game is running."""
+        return self.active
 
     def match(self, bot, user, msg, tag_info):
         """Match if the game is active or gets started with !mstart."""
@@ -93,6 +96,10 @@ class GuessMinionGame(Command):
         if not self.active:
             self.active = True
             self.initGame(bot)
+            if self.minion is None:
+                logging.warning("No Hearthstone cards loaded, can't start the minion game.")
+                self.close(bot)
+                return
             print("Right Minion: " + self.minion['name'])
             bot.write(self.responses["start_msg"]["msg"])
             self.giveClue(bot)
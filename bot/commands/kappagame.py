@@ -13,6 +13,7 @@ class KappaGame(Command):
     """
 
     perm = Permission.User
+    triggers = ["!kstart"]
 
     def __init__(self, bot):
         """Initialize variables."""
@@ -21,6 +22,10 @@ class KappaGame(Command):
         self.n = 0
         self.answered = []
 
+    def listening(self):
+        """Listen to every message while the game is running."""
+        return self.active
+
     def match(self, bot, user, msg, tag_info):
         """Match if the game is active or gets started with !kstart by a user who pays 5 points."""
         return self.active or startGame(bot, user, msg, "!kstart")
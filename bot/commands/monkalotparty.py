@@ -15,6 +15,7 @@ class MonkalotParty(Command):
     """Play the MonkalotParty."""
 
     perm = Permission.User
+    triggers = ["!pstart"]
 
     def __init__(self, bot):
         """Initialize variables."""
@@ -55,6 +56,10 @@ class MonkalotParty(Command):
 
         bot.write(s)
 
+    def listening(self):
+        """Listen to every message while the game is running."""
+        return self.active
+
     def match(self, bot, user, msg, tag_info):
         """Match if active or '!pstart'."""
         return self.active or startGame(bot, user, msg, "!pstart")
@@ -78,7 +83,7 @@ class MonkalotParty(Command):
                 bot.write(self.responses["stop_msg"]["msg"])
                 return
             if self.answer != "":    # If we are not between games.
-                if self.answer not in bot.getEmotes():   # If not an emote compare in lowercase.
+                if self.answer not in bot.getEmoteIndex().emotes:   # If not an emote compare in lowercase.
                     self.answer = self.answer.lower()
                     cmd = cmd.lower()
                 if cmd == self.answer:
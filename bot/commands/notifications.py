@@ -17,6 +17,9 @@ class Notifications(Command):
     """
 
     perm = Permission.Moderator
+    triggers = ["!notifications on", "!notifications off", "!addnotification ", "!delnotification "]
+    responseKeys = ["Notifications"]
+    dataFiles = [NOTIFICATIONS_FILE]
 
     def __init__(self, bot):
         """Initialize variables."""
@@ -8,6 +8,7 @@ class Oralpleasure(Command):
     """Turn oral pleasure on and off."""
 
     perm = Permission.User
+    triggers = ["!oralpleasure on", "!oralpleasure off"]
 
     def __init__(self, bot):
         """Initialize variables."""
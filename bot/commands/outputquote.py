@@ -11,6 +11,8 @@ class outputQuote(Command):
     """Simple Class to output quotes stored in a json-file."""
 
     perm = Permission.User
+    triggers = ["!quote"]
+    dataFiles = [QUOTES_FILE]
 
     def __init__(self, bot):
         """Load command list."""
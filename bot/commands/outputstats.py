@@ -1,30 +1,37 @@
-"""Commands: "!total [emote]", "!minute [emote]"."""
+"""Commands: "!total [emote]", "!minute [emote]", "!rate [emote]", "!topemotes [total]"."""
 from bot.commands.command import Command
 from bot.utilities.permission import Permission
 
+# Windows of the emote counter in seconds, and their placeholder in the !rate reply
+RATE_WINDOWS = [(10, "<AMOUNT_10S>"), (60, "<AMOUNT_1M>"), (300, "<AMOUNT_5M>"), (3600, "<AMOUNT_1H>")]
+TOP_EMOTES = 5  # emotes listed by !topemotes
+
 
 class outputStats(Command):
     """Reply total emote stats or stats/per minute."""
 
     perm = Permission.User
+    triggers = ["!total ", "!minute ", "!rate ", "!topemotes", "!kpm", "!tkp"]
 
     def __init__(self, bot):
         """Initialize variables."""
         self.responses = {}
 
     def match(self, bot, user, msg, tag_info):
-        """Match if msg = !total <emote> or !minute <emote>."""
+        """Match if msg = !total <emote>, !minute <emote> or !rate <emote>."""
         cmd = msg.strip().lower()
 
-        if cmd.startswith('!total ') or cmd.startswith('!minute '):
+        if cmd.startswith('!total ') or cmd.startswith('!minute ') or cmd.startswith('!rate '):
             cmd = msg.strip()   # now without .lower()
             cmd = cmd.split(' ', 1)
 
-            return cmd[1].strip() in bot.getEmotes()
+            return cmd[1].strip() in bot.getEmoteIndex().emotes
         elif cmd == '!kpm':
             return True
         elif cmd == '!tkp':
             return True
+        elif cmd == '!topemotes' or cmd == '!topemotes total':
+            return True
 
     def run(self, bot, user, msg, tag_info):
         """Write out total or minute stats of an emote."""
@@ -43,6 +50,25 @@ class outputStats(Command):
             emote = cmd[1]
             count = bot.ecount.getMinuteCount(emote)
             response = self.responses["minute_reply"]["msg"]
+        elif cmd.startswith('!rate '):
+            emote = msg.strip().split(' ', 1)[1]
+            var = {"<EMOTE>": emote}
+            for window, placeholder in RATE_WINDOWS:
+                var[placeholder] = bot.ecount.getCount(emote, window)
+            bot.write(bot.replace_vars(self.responses["rate_reply"]["msg"], var))
+            return
+        elif cmd.startswith('!topemotes'):
+            if cmd.endswith('total'):
+                top = bot.ecount.getTopTotalEmotes(TOP_EMOTES)
+                response = self.responses["top_total_reply"]["msg"]
+            else:
+                top = bot.ecount.getTopEmotes(TOP_EMOTES, bot.ecount.holdingTime)
+                response = self.responses["top_reply"]["msg"]
+            if not top:
+                response = self.responses["top_empty"]["msg"]
+            emotes = ", ".join("{} ({})".format(emote, count) for emote, count in top)
+            bot.write(bot.replace_vars(response, {"<EMOTES>": emotes}))
+            return
         elif cmd == '!tkp':
             emote = 'Kappa'
             count = bot.ecount.getTotalcount(emote)
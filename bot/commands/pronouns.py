@@ -12,6 +12,7 @@ class Pronouns(Command):
     """
 
     perm = Permission.Admin
+    triggers = ["!g "]
 
     def __init__(self, bot):
         """Initialize variables."""
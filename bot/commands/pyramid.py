@@ -24,12 +24,11 @@ class Pyramid(Command):
     """Recognizes pyramids of emotes."""
 
     perm = Permission.User
+    responseKeys = ["Pyramid"]
 
     def __init__(self, bot):
         """Initialize variables."""
         self.responses = bot.responses["Pyramid"]
-        self.nonTwitchEmotes = bot.getGlobalBttvEmotes() + bot.getChannelBTTVEmotes() + bot.getChannelFFZEmotes()
-        self.emojis = bot.getEmojis()
 
         self.pyramidBuilders = []
 
@@ -42,7 +41,7 @@ class Pyramid(Command):
 
     def run(self, bot, user, msg, tag_info):
         """Check whether a pyramid was successfully built or a new one was started."""
-        msgType, msgCount, emote = self.getInfo(msg, tag_info)
+        msgType, msgCount, emote = self.getInfo(bot, msg, tag_info)
 
         if msgType == EmoteType.INVALID:
             # Not single emote message, so we reset earlier
@@ -225,13 +224,13 @@ class Pyramid(Command):
 
         return m
 
-    def getInfo(self, msg, tag_info):
+    def getInfo(self, bot, msg, tag_info):
         eType = EmoteType.INVALID
         count = 0
         emote = ""  # can be int or str, depends on type
 
         validT, countT, emoteId = self.checkValidTwitchEmoteWithCount(tag_info)
-        validB, countB, emoteB = self.checkValidNonTwitchEmoteWithCount(msg)
+        validB, countB, emoteB = self.checkValidNonTwitchEmoteWithCount(msg, bot.getEmoteIndex())
 
         if validT:
             eType, count = EmoteType.TWITCH, countT
@@ -244,7 +243,7 @@ class Pyramid(Command):
 
         return eType, count, emote
 
-    def checkValidNonTwitchEmoteWithCount(self, msg):
+    def checkValidNonTwitchEmoteWithCount(self, msg, emoteIndex):
         invalidData = (False, -1, "")
 
         # split msg with space, check if only one emote/emoji only
@@ -258,7 +257,7 @@ class Pyramid(Command):
         # Don't use string.count() to count: need to exclude substring like 'Kappa' in 'KappaPride'
         # count = msg.count(emote)
 
-        if emote not in self.nonTwitchEmotes and emote not in self.emojis:
+        if emote not in emoteIndex.nonTwitchEmotes and emote not in emoteIndex.emojis:
             return invalidData
         else:
             # single valid emote/emoji confirmed
@@ -7,6 +7,7 @@ class PyramidBlock(Command):
     """Send a random SMOrc message."""
 
     perm = Permission.Moderator
+    triggers = ["!block on", "!block off"]
     responses = {}
 
     def __init__(self, bot):
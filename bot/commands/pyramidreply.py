@@ -14,6 +14,7 @@ class PyramidReply(Command):
     replies = {
         "!pjsalt": "PJSalt",
     }
+    triggers = list(replies)
 
     def match(self, bot, user, msg, tag_info):
         """Match if message is a possible command."""
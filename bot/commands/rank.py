@@ -1,4 +1,6 @@
 """Commands: "!rank [username]"."""
+import logging
+
 from bot.commands.command import Command
 from bot.utilities.permission import Permission
 from bot.utilities.tools import sanitizeUserName
@@ -10,6 +12,7 @@ class Rank(Command):
     """Get rank of a user."""
 
     perm = Permission.User
+    triggers = ["!rank"]
 
     def __init__(self, bot):
         """Initialize variables."""
@@ -39,13 +42,25 @@ class Rank(Command):
                 # force display name to login id ... if that user is in our cache
                 user = bot.displayNameToUserName[user]
 
-        # code may break in this case
-        # if user input !rank XXXX, where XXXX is a display name, but that user
-        # does not show up in chat so that we can't get his login_id
-        try:
-            points = bot.ranking.getPoints(user)
-            var = {"<USER>": bot.displayName(user), "<RANK>": bot.ranking.getHSRank(points), "<POINTS>": points}
+        # The user id and the display name may need API calls, answer when they arrived
+        def found(points):
+            d = bot.displayNameAsync(user)
+            d.addCallback(reply, points)
+            return d
+
+        def reply(displayName, points):
+            var = {"<USER>": displayName, "<RANK>": bot.ranking.getHSRank(points), "<POINTS>": points}
             bot.write(bot.replace_vars(self.responses["display_rank"]["msg"], var))
 
-        except UserNotFoundError:
+        def notFound(failure):
+            failure.trap(UserNotFoundError)
             bot.write(self.responses["user_not_found"]["msg"])
+
+        def failed(failure):
+            logging.error("!rank {} failed: {}".format(user, failure.getTraceback()))
+            bot.write(self.responses["lookup_failed"]["msg"])
+
+        d = bot.ranking.getPointsAsync(user)
+        d.addCallback(found)
+        d.addErrback(notFound)
+        d.addErrback(failed)
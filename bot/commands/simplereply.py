@@ -13,11 +13,13 @@ class SimpleReply(Command):
     """
 
     perm = Permission.User
+    dataFiles = [REPLIES_FILE]
 
     def __init__(self, bot):
         """Load command list."""
         with open(REPLIES_FILE.format(bot.root), "r", encoding="utf-8") as fp:
             self.replies = json.load(fp)
+        self.triggers = list(self.replies)
 
     def match(self, bot, user, msg, tag_info):
         """Match if command exists."""
@@ -5,34 +5,39 @@ import random
 from bot.commands.command import Command
 from bot.paths import SLAPHUG_FILE
 from bot.utilities.permission import Permission
+from bot.utilities.template import Template
 
 
 class SlapHug(Command):
     """Slap or hug a user."""
 
     perm = Permission.User
+    triggers = ["!slap ", "!hug "]
+    dataFiles = [SLAPHUG_FILE]
 
     def __init__(self, bot):
         """Load command list."""
         with open(SLAPHUG_FILE.format(bot.root), encoding="utf-8") as file:
             self.replies = json.load(file)
-            self.slapreply = self.replies["slap"]
-            self.hugreply = self.replies["hug"]
+            self.slapreply = [Template(str(reply)) for reply in self.replies["slap"]]
+            self.hugreply = [Template(str(reply)) for reply in self.replies["hug"]]
 
     def replaceReply(self, bot, user, target, reply):
-        """Replace words in the reply string and return it."""
-        if "<user>" in reply:
-            reply = reply.replace("<user>", bot.displayName(user))
-        if "<target>" in reply:
-            reply = reply.replace("<target>", bot.displayName(target))
+        """Replace words in the reply template and return the string."""
+        # Names and pronouns are only looked up if the reply uses them
+        var = {}
+        if "<user>" in reply.placeholders:
+            var["<user>"] = bot.displayName(user)
+        if "<target>" in reply.placeholders:
+            var["<target>"] = bot.displayName(target)
         for i in [0, 1, 2, 3]:
             keyword = "<u_pronoun" + str(i) + ">"
-            if keyword in reply:
-                reply = reply.replace(keyword, bot.pronoun(user)[i])
+            if keyword in reply.placeholders:
+                var[keyword] = bot.pronoun(user)[i]
             keyword = "<t_pronoun" + str(i) + ">"
-            if keyword in reply:
-                reply = reply.replace(keyword, bot.pronoun(target)[i])
-        return reply
+            if keyword in reply.placeholders:
+                var[keyword] = bot.pronoun(target)[i]
+        return reply.render(var)
 
     def match(self, bot, user, msg, tag_info):
         """Match if command is !slap/!hug <chatter>."""
@@ -52,9 +57,9 @@ class SlapHug(Command):
         target = cmd[1].lower().strip()
 
         if cmd[0].strip() == "!slap":
-            reply = str(random.choice(self.slapreply))
+            reply = random.choice(self.slapreply)
         elif cmd[0].strip() == "!hug":
-            reply = str(random.choice(self.hugreply))
+            reply = random.choice(self.hugreply)
 
         reply = self.replaceReply(bot, user, target, reply)
         bot.write(reply)
@@ -8,6 +8,7 @@ class Sleep(Command):
     """Allows admins and trusted mods to pause the bot."""
 
     perm = Permission.Moderator
+    triggers = ["!sleep", "!wakeup"]
 
     def __init__(self, bot):
         """Initialize variables."""
@@ -11,6 +11,8 @@ class Smorc(Command):
     """Send a random SMOrc message."""
 
     perm = Permission.User
+    triggers = ["!smorc"]
+    dataFiles = [SMORC_FILE]
 
     def __init__(self, bot):
         """Load command list."""
@@ -8,6 +8,7 @@ from cleverwrap import CleverWrap
 from twisted.internet import reactor
 
 from bot.commands.command import Command
+from bot.utilities.lazyresource import LazyResource
 from bot.utilities.permission import Permission
 
 
@@ -16,6 +17,7 @@ class Speech(Command):
 
     perm = Permission.User
     reloadable = False
+    configKeys = ["cleverbot_key", "chatterbot_trainer"]
 
     def __init__(self, bot):
         """Initialize variables."""
@@ -87,27 +89,27 @@ class Chatterbot(Replier):
     name = "chatterbot"
 
     def __init__(self, trainer):
-        self.trained = False
         self.conversations = {}
-        logging.info("Setting up chat bot...")
-        # asynchronous training
-        reactor.callInThread(self._train, trainer)
-    
+        # Training takes long and a lot of memory, it only starts when someone talks to the bot
+        self.chatterbot = LazyResource(lambda: self._train(trainer), "chat bot")
+
     def _train(self, trainer):
         chatbot_logger = logging.Logger(logging.WARNING)
         # Train based on the english corpus
-        self.chatterbot = ChatBot(
+        chatterbot = ChatBot(
             'Monkalot',
             read_only=True,
             trainer='chatterbot.trainers.ChatterBotCorpusTrainer',
             logger=chatbot_logger
         )
-        self.chatterbot.train(trainer)
-        self.trained = True
+        chatterbot.train(trainer)
         logging.info("...chat bot finished training.")
+        return chatterbot
 
     def get_reply(self, message, name):
         """Get a reply from the chat bot."""
-        if self.trained:
-            return str(self.chatterbot.get_response(message))
+        if self.chatterbot.ready():
+            return str(self.chatterbot.get().get_response(message))
+        # asynchronous training
+        self.chatterbot.preload()
         return "Please wait a little longer, I'm not ready to talk yet :)"
@@ -1,6 +1,9 @@
 """Commands: "!fps", "!uptime", "!bttv"."""
+import logging
 from datetime import datetime
 
+from requests import RequestException
+
 from bot.commands.command import Command
 from bot.utilities.permission import Permission
 from bot.utilities.tools import EmoteListToString, TwitchTime2datetime
@@ -10,6 +13,7 @@ class StreamInfo(Command):
     """Get stream informations and write them in chat."""
 
     perm = Permission.User
+    triggers = ["!fps", "!uptime", "!bttv"]
 
     def __init__(self, bot):
         """Initialize variables."""
@@ -24,12 +28,30 @@ class StreamInfo(Command):
         """Get stream object and return requested information."""
         self.responses = bot.responses["StreamInfo"]
         cmd = msg.lower()
-        self.stream = bot.getStream(bot.channelID)
 
         if cmd.startswith("!bttv"):
             var = {"<MULTIEMOTES>": EmoteListToString(bot.getChannelBTTVEmotes())}
             bot.write(bot.replace_vars(self.responses["bttv_msg"]["msg"], var))
-        elif self.stream["stream"] is None:
+            return
+
+        # Answer once twitch replies, chat keeps being processed in the meantime
+        d = bot.getStreamAsync(bot.channelID)
+        d.addCallback(self.reply, bot, cmd)
+        d.addErrback(self.failed, bot)
+
+    def failed(self, failure, bot):
+        """Log failed stream requests or replies and tell the chat."""
+        if failure.check(RequestException, ValueError):
+            logging.warning("Stream object could not be fetched: {}".format(failure.getErrorMessage()))
+        else:
+            logging.error("Stream information could not be written: {}".format(failure.getTraceback()))
+        bot.write(self.responses["unavailable"]["msg"])
+
+    def reply(self, stream, bot, cmd):
+        """Write the requested information of the stream object."""
+        self.stream = stream
+
+        if self.stream["stream"] is None:
             bot.write(self.responses["stream_off"]["msg"])
         elif cmd.startswith("!fps"):
             fps = format(self.stream["stream"]["average_fps"], '.2f')
@@ -7,6 +7,7 @@ class TentaReply(Command):
     """Reply with squid emotes or penta emotes."""
 
     perm = Permission.User
+    triggers = ["!tenta ", "!penta ", "!hentai "]
 
     def match(self, bot, user, msg, tag_info):
         """Match if the message starts with '!tenta ' or '!penta ' followed by an emote."""
@@ -15,7 +16,7 @@ class TentaReply(Command):
             if len(cmd) == 2:
                 arg = cmd[1].strip()
                 """Check if arg is an emote."""
-                if arg in bot.getEmotes():
+                if arg in bot.getEmoteIndex().emotes:
                     return True
         return False
 
@@ -8,6 +8,8 @@ class Tip(Command):
     """Tip spampoints to another user."""
 
     perm = Permission.User
+    triggers = ["!tip "]
+    responseKeys = ["Tip"]
 
     def __init__(self, bot):
         """Initialize variables."""
@@ -2,6 +2,7 @@
 import logging
 
 from requests import RequestException
+from twisted.internet import defer
 
 from bot.commands.command import Command
 from bot.utilities.permission import Permission
@@ -11,6 +12,7 @@ class TopSpammers(Command):
     """Write top spammers."""
 
     perm = Permission.User
+    triggers = ["!topspammers"]
 
     def __init__(self, bot):
         """Initialize variables."""
@@ -25,20 +27,44 @@ class TopSpammers(Command):
         self.responses = bot.responses["TopSpammers"]
         ranking = bot.ranking.getTopSpammers(5)
         out = self.responses["heading"]["msg"]
-        if len(ranking) > 0:
-            # TODO: use a template string to do this?
-            top = []
-            for (viewer_id, point) in ranking:
-                # Since the id we're asking for can be one we added to the database a long time ago,
-                # the account may be deleted. This results in a RequestException. Display a spooky skeleton to show the account is dead.
-                try:
-                    displayName = bot.getDisplayNameFromID(viewer_id)
-                except RequestException:
-                    logging.info("Display name for id '{}' not found. Returning spooky ☠️ as top spammer.".format(viewer_id))
-                    displayName = "☠️"
-
-                top.append("{}: Rank {}".format(displayName, bot.ranking.getHSRank(point)))
-
-            out += ", ".join(top)
-            out += "."
+        if len(ranking) == 0:
+            bot.write(out)
+            return
+
+        # Look up all display names at once, the message is written when the last one arrived
+        names = [self.displayName(bot, viewer_id) for (viewer_id, _) in ranking]
+        d = defer.gatherResults(names, consumeErrors=True)
+        d.addCallback(self.reply, bot, out, ranking)
+        d.addErrback(self.failed, bot)
+
+    def displayName(self, bot, viewer_id):
+        """Return a Deferred firing with the display name of viewer_id."""
+        # Since the id we're asking for can be one we added to the database a long time ago,
+        # the account may be deleted. This results in a RequestException. Display a spooky skeleton to show the account is dead.
+        def dead(failure):
+            failure.trap(RequestException, KeyError, ValueError)
+            logging.info("Display name for id '{}' not found. Returning spooky ☠️ as top spammer.".format(viewer_id))
+            return "☠️"
+
+        d = bot.getDisplayNameFromIDAsync(viewer_id)
+        d.addErrback(dead)
+        return d
+
+    def failed(self, failure, bot):
+        """Log a failed reply and tell the chat."""
+        logging.error("Top spammers could not be written: {}".format(failure.getTraceback()))
+        bot.write(self.responses["unavailable"]["msg"])
+
+    def reply(self, names, bot, out, ranking):
+        """Write the top spammers with their display names."""
+        # TODO: use a template string to do this?
+        top = []
+        rankTable = bot.ranking.rankTable
+        for i, (displayName, (_, point)) in enumerate(zip(names, ranking)):
+            # The list is sorted, so the legend position is 1 + the amount of entries with more points before it
+            legendRank = 1 + sum(1 for (_, p) in ranking[:i] if p > point)
+            top.append("{}: Rank {}".format(displayName, rankTable.format(point, legendRank)))
+
+        out += ", ".join(top)
+        out += "."
         bot.write(out)
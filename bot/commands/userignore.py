@@ -7,6 +7,8 @@ class UserIgnore(Command):
     """Let mods to make bot ignore/unignore a user."""
 
     perm = Permission.Moderator
+    triggers = ["!ignore ", "!unignore "]
+    responseKeys = ["userignore"]
 
     def __init__(self, bot):
         """Initialize responses."""
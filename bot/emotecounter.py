@@ -1,25 +1,49 @@
 """Class that counts the emotes from chat messages."""
+import heapq
 import json
 import logging
 import time
-from collections import deque
+
+from twisted.internet import reactor
+
 from bot.paths import STATISTIC_FILE
+from bot.utilities.tools import dumpJSONAtomic, is_callID_active
+
+DEFAULT_FLUSH_INTERVAL = 60     # max. seconds between writes of the statistic file
+DEFAULT_FLUSH_THRESHOLD = 500   # messages with emotes after which the statistic file gets written
+WINDOWS = (10, 60, 300, 3600)   # seconds emote counts can be queried for
+TOP_CAPACITY = 25               # emotes kept in the all time top list, see getTopTotalEmotes()
+
+
+def topEmotes(counts, k):
+    """Return the k (emote, count) pairs of counts with the highest counts, ties by name."""
+    return heapq.nsmallest(k, counts.items(), key=lambda item: (-item[1], item[0]))
 
 
 class EmoteCounter(object):
-    """Generic class to handle emote per minute."""
+    """Generic class to handle emote per minute.
 
-    def __init__(self, t=60):
+    Counts are kept in a ring buffer of per-second buckets, one for every second of the
+    longest window. For every window a running total of the completed seconds is kept: the
+    bucket of a second is added once when the second is over and subtracted once when it
+    leaves the window. So a message only updates the bucket of the current second, and
+    queries cost the same no matter how many messages were sent in the window.
+    """
+
+    def __init__(self, t=60, windows=WINDOWS):
         """Set up counters."""
-        # Queue to store emote entries (tuples)
-        self.emoteRecord = deque()
         self.on = False
-        # only store records within (holding time) secs, 60 on default
+        # getMinuteCount() returns the count of the last (holding time) secs, 60 on default
         self.holdingTime = t
+        self.windows = tuple(sorted(set(windows) | {t}))
+        self.horizon = self.windows[-1]
 
-        # Store the accumulated emote count within holding time
-        # Cannot be wrong in single-threaded env
-        self.emoteCount = {}
+        # Slot second % horizon holds the counts of that second, if seconds[slot] == second
+        self.buckets = [None] * self.horizon
+        self.seconds = [None] * self.horizon
+        # Maps window -> emote -> count within the completed seconds of the last window seconds
+        self.totals = {window: {} for window in self.windows}
+        self.now = None     # second the totals are up to date for
 
     def stopCPM(self):
         """Stop counter."""
@@ -34,68 +58,127 @@ class EmoteCounter(object):
         if not self.on:
             return
 
-        self.emoteRecord.append(self.__createEmoteEntry(emoteDict))
-        self.__updateMinuteCount(emoteDict)
-        self.__updateRecord()
-
-    # for debugging only
-    # def showRecord(self):
-        # return self.emoteRecord
+        now = self.__advance()
+        slot = now % self.horizon
+        bucket = self.buckets[slot]
+        if bucket is None:
+            bucket = self.buckets[slot] = {}
+        for emote, count in emoteDict.items():
+            bucket[emote] = bucket.get(emote, 0) + count
 
     # NOTE: Not minute if holdingTime is not 60
     def getMinuteCount(self, emote):
         """Get emote count for last minute (or custom holdingTime)."""
-        self.__updateRecord()
-        return self.emoteCount.get(emote, 0)
-
-    def __updateRecord(self):
-        """Cleanup emoteRecord by removing older(smaller) entries."""
-        timeLimit = self.__getCurrentTime() - self.holdingTime
-
-        # This is like Priority Queue (priority, task), we have (time, emote)
-        # The order of content (emote) is unimportant for this case
-        while(len(self.emoteRecord) > 0 and timeLimit > self.emoteRecord[0][0]):
-            emoteEntry = self.emoteRecord.popleft()[1]
-            self.__updateMinuteCount(emoteEntry, minus=True)
-
-    def __createEmoteEntry(self, emoteDict):
-        """Create a tuple of timestamp and emote dictionary."""
-        return (self.__getCurrentTime(), emoteDict)
-
-    def __getCurrentTime(self):
-        """Get Unix Second as int."""
-        return int(time.time())
-
-    def __updateMinuteCount(self, emoteEntry, minus=False):
-        # if minus is True, we want to minus the minute count instead
-        multiplier = 1
-        if minus:
-            multiplier = -1
-        for k in emoteEntry:
-            if k not in self.emoteCount:
-                if minus:
-                    raise ValueError("Attempt to minus count on non-exist entries of {} in emoteCount".format(k))
-                else:
-                    self.emoteCount[k] = 0
-            self.emoteCount[k] += emoteEntry[k] * multiplier
+        return self.getCount(emote, self.holdingTime)
+
+    def getCount(self, emote, window=60):
+        """Get emote count for the last window seconds, window has to be one of self.windows."""
+        now = self.__advance()
+        current = self.buckets[now % self.horizon] or {}
+        return self.totals[window].get(emote, 0) + current.get(emote, 0)
+
+    def getCounts(self, window=60):
+        """Return a new dict emote -> count for the last window seconds."""
+        now = self.__advance()
+        counts = dict(self.totals[window])
+        for emote, count in (self.buckets[now % self.horizon] or {}).items():
+            counts[emote] = counts.get(emote, 0) + count
+        return counts
+
+    def getTopEmotes(self, k=5, window=60):
+        """Return the k emotes used most in the last window seconds, as list of (emote, count).
+
+        Only emotes used in the window are counted, so this doesn't depend on the message volume.
+        """
+        return topEmotes(self.getCounts(window), k)
+
+    def __advance(self):
+        """Bring the totals up to date for the current second and return it."""
+        now = int(time.time())
+        if self.now is None or not 0 <= now - self.now < self.horizon:
+            # Everything counted left all windows (or the clock was set back)
+            self.buckets = [None] * self.horizon
+            self.seconds = [None] * self.horizon
+            self.totals = {window: {} for window in self.windows}
+            self.seconds[now % self.horizon] = now
+        else:
+            for second in range(self.now + 1, now + 1):
+                over = self.buckets[(second - 1) % self.horizon]
+                for window, totals in self.totals.items():
+                    if over is not None:
+                        self.__add(totals, over)
+                    leaving = (second - window) % self.horizon
+                    if self.seconds[leaving] == second - window and self.buckets[leaving] is not None:
+                        self.__subtract(totals, self.buckets[leaving])
+                # The second reusing the slot left the longest window just now
+                slot = second % self.horizon
+                self.buckets[slot] = None
+                self.seconds[slot] = second
+        self.now = now
+        return now
+
+    def __add(self, totals, bucket):
+        """Add the counts of a bucket to totals."""
+        for emote, count in bucket.items():
+            totals[emote] = totals.get(emote, 0) + count
+
+    def __subtract(self, totals, bucket):
+        """Subtract the counts of a bucket from totals, emotes with no count left are removed."""
+        for emote, count in bucket.items():
+            left = totals[emote] - count
+            if left:
+                totals[emote] = left
+            else:
+                del totals[emote]
 
 
 class EmoteCounterForBot(EmoteCounter):
-    """Emote counter class for bot including total count, inherit from EmoteCounter."""
+    """Emote counter class for bot including total count, inherit from EmoteCounter.
+
+    The total count is kept in memory and only written to the statistic file every
+    'emote_stats_flush_interval' seconds, or once 'emote_stats_flush_threshold' messages
+    with emotes have been counted since the last write.
+    """
 
     def __init__(self, bot, t=60):
         """Initialize counter."""
         super().__init__(t)
 
         self.bot = bot
+        self.flushInterval = bot.config.get("emote_stats_flush_interval", DEFAULT_FLUSH_INTERVAL)
+        self.flushThreshold = bot.config.get("emote_stats_flush_threshold", DEFAULT_FLUSH_THRESHOLD)
+
+        self.totalCount = {}
+        # The TOP_CAPACITY emotes with the highest total count, kept up to date with every message
+        self.topTotal = {}
+        self.topTotalOf = None  # the totalCount topTotal is for, it is replaced by __initTotalCount() and setTotalCount()
+        self.topTotalMin = None     # lowest count in a full topTotal, None if unknown
+        self.dirty = 0   # amount of counted messages not written to the statistic file yet
+        self.callID = None
+
         self.__initTotalCount()
+        self.callID = reactor.callLater(self.flushInterval, self.__flushLoop)
 
     def getTotalcount(self, emote):
         """Return the Total count of an emote."""
-        with open(STATISTIC_FILE.format(self.bot.root), encoding="utf-8") as file:
-            totalCount = json.load(file)
+        return self.totalCount.get(emote, 0)
 
-        return totalCount.get(emote, 0)
+    def setTotalCount(self, totalCount):
+        """Replace the total count and write it, e.g. one edited through the web api. Call from the reactor thread.
+
+        Writing it here keeps the file from being overwritten by a flush of the old counts.
+        """
+        self.totalCount = totalCount
+        self.flush()
+
+    def getTopTotalEmotes(self, k=5):
+        """Return the k (at most TOP_CAPACITY) emotes used most of all time, as list of (emote, count)."""
+        if self.topTotalOf is not self.totalCount:
+            self.topTotal = dict(topEmotes(self.totalCount, TOP_CAPACITY))
+            self.topTotalOf = self.totalCount
+            self.topTotalMin = None
+        # totalCount starts with every emote at 0
+        return [(emote, count) for emote, count in topEmotes(self.topTotal, min(k, TOP_CAPACITY)) if count > 0]
 
     def processMessage(self, msg):
         """Process an incoming chatmessage."""
@@ -105,8 +188,26 @@ class EmoteCounterForBot(EmoteCounter):
             self.__updateTotalCount(emoteDict)
             self.addEntry(emoteDict)
 
+    def flush(self):
+        """Write the total count to the statistic file."""
+        dumpJSONAtomic(self.totalCount, STATISTIC_FILE.format(self.bot.root), indent=4)
+        self.dirty = 0
+
+    def close(self):
+        """Stop the periodic flushing and write outstanding counts."""
+        if is_callID_active(self.callID):
+            self.callID.cancel()
+        if self.dirty > 0:
+            self.flush()
+
+    def __flushLoop(self):
+        """Periodically write the total count, if it changed."""
+        if self.dirty > 0:
+            self.flush()
+        self.callID = reactor.callLater(self.flushInterval, self.__flushLoop)
+
     def __initTotalCount(self):
-        """Create a emote stat JSON if there aren't one already."""
+        """Load the emote stat JSON into memory, create it if there isn't one already."""
         # True when need to create or add new emote to file
         refreshFile = False
         try:
@@ -130,9 +231,9 @@ class EmoteCounterForBot(EmoteCounter):
             totalData = self.__createEmptyTotalList()
             refreshFile = True
 
+        self.totalCount = totalData
         if refreshFile:
-            with open(STATISTIC_FILE.format(self.bot.root), 'w+', encoding="utf-8") as file:
-                json.dump(totalData, file, indent=4)
+            self.flush()
 
     def __createEmptyTotalList(self):
         """Create an emote-statistic-dictionary and set all values to 0.
@@ -147,18 +248,36 @@ class EmoteCounterForBot(EmoteCounter):
         return emptyList
 
     def __updateTotalCount(self, emoteDict):
-        """Update the total emote count."""
-        with open(STATISTIC_FILE.format(self.bot.root), encoding="utf-8") as file:
-            totalCount = json.load(file)
-
+        """Update the total emote count, write it to file if enough changes piled up."""
         for emote in emoteDict:
-            if emote in totalCount:
-                totalCount[emote] += emoteDict[emote]
+            if emote in self.totalCount:
+                self.totalCount[emote] += emoteDict[emote]
             else:
-                totalCount[emote] = emoteDict[emote]
+                self.totalCount[emote] = emoteDict[emote]
+            self.__updateTopTotal(emote)
+
+        self.dirty += 1
+        if self.dirty >= self.flushThreshold:
+            self.flush()
+
+    def __updateTopTotal(self, emote):
+        """Keep topTotal the emotes with the highest total counts, which only grow."""
+        if self.topTotalOf is not self.totalCount:
+            return  # Rebuilt on the next query
+        count = self.totalCount[emote]
+        if emote in self.topTotal or len(self.topTotal) < TOP_CAPACITY:
+            if self.topTotal.get(emote) == self.topTotalMin:
+                self.topTotalMin = None
+            self.topTotal[emote] = count
+            return
 
-        with open(STATISTIC_FILE.format(self.bot.root), 'w', encoding="utf-8") as file:
-            json.dump(totalCount, file, indent=4)
+        if self.topTotalMin is None:
+            self.topTotalMin = min(self.topTotal.values())
+        if count > self.topTotalMin:
+            # Replace the emote with the lowest count
+            del self.topTotal[min(self.topTotal, key=self.topTotal.get)]
+            self.topTotal[emote] = count
+            self.topTotalMin = None
 
     def __countEmotes(self, msg):
         """Count the Emotes of the message.
@@ -166,11 +285,12 @@ class EmoteCounterForBot(EmoteCounter):
         Return a dictionary with emote count
         """
         emoteDict = {}
+        emotes = self.bot.getEmoteIndex().emotes
         splitMsg = msg.strip()
         splitMsg = splitMsg.split(' ')
 
         for m in splitMsg:
-            if m in self.bot.getEmotes():
+            if m in emotes:
                 if m in emoteDict:
                     emoteDict[m] += 1
                 else:
@@ -0,0 +1,122 @@
+"""Module for the IRC connections to Twitch, shared by all bots."""
+import logging
+from collections import defaultdict
+
+from twisted.internet import protocol, reactor
+
+from bot.multibot_irc_client import MultiBotIRCClient
+from bot.utilities.outbound import OutboundQueue
+from bot.utilities.ratelimit import RateLimiter
+
+DEFAULT_HOST = 'irc.twitch.tv'
+DEFAULT_PORT = 6667
+CHANNELS_PER_CONNECTION = 50
+JOIN_LIMIT = 20         # Twitch allows an account 20 joins ...
+JOIN_PERIOD = 10        # ... per 10 seconds
+MAX_WAIT_TIME = 512     # seconds between reconnect attempts at most
+
+
+class ShardFactory(protocol.ClientFactory):
+    """Factory for one IRC connection, which serves the bots of some channels of one account."""
+
+    protocol = MultiBotIRCClient
+
+    # Shared by all connections
+    tags = defaultdict(dict)
+    activity = dict()
+
+    def __init__(self, name, nickname, password, bots, joinLimiter, outbound):
+        """Initialize variables."""
+        self.name = name
+        self.nickname = nickname
+        self.password = password
+        self.bots = bots
+        self.joinLimiter = joinLimiter
+        self.outbound = outbound
+        self.wait_time = 1
+        self.client = None      # The signed on client, None while disconnected
+        self.whisperBots = []   # All bots of the account on its first connection, see irc_WHISPER()
+        self.channels = {}
+        self.updateChannels()
+
+    def updateChannels(self):
+        """Rebuild the index channel -> bots of that channel."""
+        channels = {}
+        for b in self.bots:
+            channels.setdefault(b.channel, []).append(b)
+        self.channels = channels
+
+    def clientConnectionLost(self, connector, reason):
+        """Log and reconnect."""
+        logging.error("Lost connection {}".format(self.name))
+        self.client = None
+        connector.connect()
+
+    def clientConnectionFailed(self, connector, reason):
+        """Log and try to reconnect after some time, without blocking the other connections."""
+        msg = "Could not connect {}, retrying in {}s"
+        logging.warning(msg.format(self.name, self.wait_time))
+        self.client = None
+        reactor.callLater(self.wait_time, connector.connect)
+        self.wait_time = min(MAX_WAIT_TIME, self.wait_time * 2)
+
+
+class IRCConnectionManager(object):
+    """Distributes the channels of all bots over IRC connections.
+
+    Bots are grouped by their account (username and oauth key), every account connects on
+    its own. The channels of an account are split into shards of at most channelsPerConnection
+    channels, balanced by the number of chatters. Joins and messages of an account are rate limited
+    together, also when a connection rejoins its channels after reconnecting.
+    """
+
+    def __init__(self, bots, host=DEFAULT_HOST, port=DEFAULT_PORT, channelsPerConnection=CHANNELS_PER_CONNECTION):
+        """Create the shards, connect() opens the connections."""
+        self.host = host
+        self.port = port
+        self.channelsPerConnection = max(1, channelsPerConnection)
+        self.shards = self.createShards(bots)
+
+    def createShards(self, bots):
+        """Return a ShardFactory for every connection needed by bots."""
+        accounts = defaultdict(list)
+        for b in bots:
+            accounts[(b.nickname, b.password)].append(b)
+
+        shards = []
+        for (nickname, password), accountBots in accounts.items():
+            channels = defaultdict(list)
+            for b in accountBots:
+                channels[b.channel].append(b)
+
+            # Biggest channels first, each into the least loaded shard
+            count = -(-len(channels) // self.channelsPerConnection)
+            groups = [[] for _ in range(count)]
+            loads = [0] * count
+            sizes = [0] * count
+            weighted = sorted(channels.values(), key=lambda channelBots: len(channelBots[0].users), reverse=True)
+            for channelBots in weighted:
+                i = min((i for i in range(count) if sizes[i] < self.channelsPerConnection), key=lambda i: loads[i])
+                groups[i].extend(channelBots)
+                loads[i] += len(channelBots[0].users)
+                sizes[i] += 1
+
+            # Twitch limits joins and messages per account, so all its connections share the limits
+            joinLimiter = RateLimiter(JOIN_LIMIT, JOIN_PERIOD)
+            outbound = OutboundQueue(nickname)
+            accountShards = [ShardFactory("{}/{}".format(nickname, i), nickname, password, group, joinLimiter, outbound)
+                             for i, group in enumerate(groups)]
+            accountShards[0].whisperBots = accountBots
+            for i, shard in enumerate(accountShards):
+                logging.warning("Connection {}: {} channels, {} chatters".format(shard.name, sizes[i], loads[i]))
+            shards.extend(accountShards)
+        return shards
+
+    def getStats(self):
+        """Return the outbound message statistics of every account."""
+        return {shard.nickname: shard.outbound.getStats() for shard in self.shards}
+
+    def connect(self):
+        """Open all connections."""
+        for shard in self.shards:
+            reactor.connectTCP(self.host, self.port, shard)
@@ -1,34 +1,37 @@
 """Module for IRC Client and threaded logging."""
-import json
 import logging
+import sys
 
 from twisted.words.protocols import irc
 
-from bot.paths import CONFIG_PATH
+from bot.utilities.ircparser import parseLine
+from bot.utilities.outbound import PRIORITY_CHAT
 
 
 class MultiBotIRCClient(irc.IRCClient, object):
     """Irc Client that distributes messages to bots, based on the channel they're from.
 
     # Twitch IRC reference: https://dev.twitch.tv/docs/v5/guides/irc
-    # Set this globally, by using MultiBotIRCClient.bots = x
+    # Every connection serves the bots of its factory, see bot.ircmanager
     """
 
-    bots = []
+    def connectionMade(self):
+        """Take the account of the connection from the factory and register."""
+        self.nickname = self.factory.nickname
+        self.password = self.factory.password
+        super().connectionMade()
 
-    def __init__(self):
-        """Set up IRC Client."""
-        # Right now, only one bot can listen, so we take the values of the first one.
-        with open(CONFIG_PATH.format(self.bots[0].root), 'r', encoding="utf-8") as file:
-            CONFIG = json.load(file)
-        self.nickname = str(CONFIG['username'])
-        self.clientID = str(CONFIG['clientID'])
-        self.password = str(CONFIG['oauth_key'])
+    def connectionLost(self, reason):
+        """Stop joining channels on this connection."""
+        if self.factory.client is self:
+            self.factory.client = None
+        super().connectionLost(reason)
 
     def signedOn(self):
-        """Call when first signed on."""
+        """Call when signed on, also after reconnecting."""
         self.factory.wait_time = 1
-        logging.warning("Signed on as {}".format(self.nickname))
+        self.factory.client = self
+        logging.warning("Signed on as {} ({} channels)".format(self.nickname, len(self.factory.channels)))
 
         # Get data structures stored in factory
         self.activity = self.factory.activity
@@ -39,12 +42,27 @@ class MultiBotIRCClient(irc.IRCClient, object):
         self.sendLine("CAP REQ :twitch.tv/commands")
         self.sendLine("CAP REQ :twitch.tv/tags")
 
-        joinedChannels = []
-        for b in MultiBotIRCClient.bots:
+        for b in self.factory.bots:
             b.irc = self
-            if b.channel not in joinedChannels:
-                self.join(b.channel)
-                joinedChannels.append(b.channel)
+        # Twitch limits joins per account, so they are spread out
+        for channel in self.factory.channels:
+            self.factory.joinLimiter.call(self.joinChannel, channel)
+        # Send what was queued while disconnected
+        self.factory.outbound.drain()
+
+    def joinChannel(self, channel):
+        """Join channel, unless the connection was lost while waiting for the join limit."""
+        if self.factory.client is self:
+            self.join(channel)
+
+    def updateChannels(self):
+        """Rebuild the channel index and join or leave channels, has to be called whenever the channel of a bot changes."""
+        old = set(self.factory.channels)
+        self.factory.updateChannels()
+        for channel in old - set(self.factory.channels):
+            self.leave(channel)
+        for channel in set(self.factory.channels) - old:
+            self.factory.joinLimiter.call(self.joinChannel, channel)
 
     def joined(self, channel):
         """Log when channel is joined."""
@@ -72,48 +90,23 @@ class MultiBotIRCClient(irc.IRCClient, object):
         # print("Show tags", tags)
         tag_info = self.parseTagForChatMessage(tags)
 
-        for b in MultiBotIRCClient.bots:
-            if b.channel == channel:
-                b.process_command(name, msg, tag_info)
+        for b in self.factory.channels.get(channel, ()):
+            b.process_command(name, msg, tag_info)
 
     def modeChanged(self, user, channel, added, modes, args):
         """Not sure what this does. Maybe gets called when mods get added/removed."""
-        for b in MultiBotIRCClient.bots:
-            if b.channel == channel:
-                b.modeChanged(user, channel, added, modes, args)
+        for b in self.factory.channels.get(channel, ()):
+            b.modeChanged(user, channel, added, modes, args)
 
     def userJoined(self, user, channel):
         """Update user list when user joins."""
-        for b in MultiBotIRCClient.bots:
-            if b.channel == channel:
-                b.users.add(user)
+        for b in self.factory.channels.get(channel, ()):
+            b.users.add(user)
 
     def userLeft(self, user, channel):
         """Update user list when user leaves."""
-        for b in MultiBotIRCClient.bots:
-            if b.channel == channel:
-                b.users.discard(user)
-
-    def parsemsg(self, s):
-        """Break a message from an IRC server into its prefix, command, and arguments."""
-        tags = {}
-        prefix = ''
-        trailing = []
-        if s[0] == '@':
-            # remove 1st '@', then take everything until the 1st space
-            tags_str, s = s[1:].split(' ', 1)
-            tag_list = tags_str.split(';')
-            tags = self.unescapeTags(dict(t.split('=') for t in tag_list))
-        if s[0] == ':':
-            prefix, s = s[1:].split(' ', 1)
-        if s.find(' :') != -1:
-            s, trailing = s.split(' :', 1)
-            args = s.split()
-            args.append(trailing)
-        else:
-            args = s.split()
-        command = args.pop(0).lower()
-        return tags, prefix, command, args
+        for b in self.factory.channels.get(channel, ()):
+            b.users.discard(user)
 
     def parseIRCLastLine(self, args):
         # normal has 2 objects inside only, check the quoted part
@@ -123,44 +116,31 @@ class MultiBotIRCClient(irc.IRCClient, object):
 
         return channel, msg
 
-    def unescapeTags(self, tags):
-        # http://ircv3.net/specs/core/message-tags-3.2.html#escaping-values
-        for k, v in tags.items():
-            content = v
-
-            content = content.replace("\:",  ";")
-            content = content.replace("\s:", " ")
-            # \\ -> \
-            content = content.replace("\\\\", "\\")
-            # \r -> CR(ASCII:13)
-            content = content.replace("\\r", "\r")
-            # \n -> LF(ASCII:10)
-            content = content.replace("\\n", "\n")
-
-            tags[k] = content
+    def write(self, channel, msg, priority=PRIORITY_CHAT):
+        """Queue message for channel, it is sent as soon as the rate limits of the account allow."""
+        self.factory.outbound.send(self.factory, channel, msg, priority)
 
-        return tags
-
-    def write(self, channel, msg):
+    def deliver(self, channel, msg):
         """Send message to channel and log it."""
         self.msg(channel, msg)
         logging.info("[{}] {}: {}".format(channel, self.nickname, msg))
 
     def lineReceived(self, line):
-        """Parse IRC line."""
-        line = line.decode("utf-8")
-        # First, we check for any custom twitch commands
-        tags, prefix, cmd, args = self.parsemsg(line)
+        """Parse IRC line.
+
+        The line is parsed once. Chat messages are handled here completely, everything
+        else is passed on to IRCClient's handlers without parsing it again.
+        """
+        try:
+            tags, prefix, cmd, args = parseLine(line)
+        except irc.IRCBadMessage:
+            self.badMessage(line, *sys.exc_info())
+            return
 
         # print("< " + line)
 
-        if cmd == "hosttarget":
-            self.hostTarget(*args)
-        elif cmd == "clearchat":
-            self.clearChat(*args)
-        elif cmd == "notice":
-            self.notice(prefix, tags, args)
-        elif cmd == "privmsg":
+        # First, we check for any custom twitch commands
+        if cmd == "PRIVMSG":
             self.userState(prefix, tags, args)
 
             # Now we do the parse chat message ourself, not by privmsg() anymore
@@ -169,20 +149,28 @@ class MultiBotIRCClient(irc.IRCClient, object):
             channel, message = self.parseIRCLastLine(args)
             self.twitch_privmsg(user, channel, message, tags)
 
-        # elif cmd == "whisper":
+            # IRCClient would only call the empty privmsg() / action()
+            return
+
+        elif cmd == "HOSTTARGET":
+            self.hostTarget(*args)
+        elif cmd == "CLEARCHAT":
+            self.clearChat(*args)
+        elif cmd == "NOTICE":
+            self.notice(prefix, tags, args)
+        elif cmd == "USERSTATE":
+            # Sent for our account after joining and sending, mods have higher rate limits
+            self.factory.outbound.setModerator(args[0], tags.get('mod') == '1')
+
+        # elif cmd == "WHISPER":
         # pass
-        elif cmd == "usernotice":
+        elif cmd == "USERNOTICE":
             channel, msg = self.parseIRCLastLine(args)
-            for b in MultiBotIRCClient.bots:
-                if b.channel == channel:
-                    self.handleUSERNOTICE(b, tags, msg)
-
-        # Remove tag information
-        if line[0] == "@":
-            line = line.split(' ', 1)[1]
+            for b in self.factory.channels.get(channel, ()):
+                self.handleUSERNOTICE(b, tags, msg)
 
         # Then we let IRCClient handle the rest
-        super().lineReceived(line)
+        self.handleCommand(cmd, prefix, args)
 
     def handleUSERNOTICE(self, bot, tags, msg):
         # https://dev.twitch.tv/docs/irc#usernotice-twitch-tags
@@ -209,10 +197,9 @@ class MultiBotIRCClient(irc.IRCClient, object):
         self.tags[name].update(tags)
 
         channel = args[0]
-        for b in MultiBotIRCClient.bots:
-            # our bot store channel starting with '#'
-            if b.channel == channel:
-                b.userState(prefix, tags)
+        # our bot store channel starting with '#'
+        for b in self.factory.channels.get(channel, ()):
+            b.userState(prefix, tags)
 
     def irc_WHISPER(self, prefix, args):
         """Method to let twisted to handle non standard IRC message (whisper)."""
@@ -221,16 +208,16 @@ class MultiBotIRCClient(irc.IRCClient, object):
         # args[0]: receiver of whisper message (should be bot)
         # args[1]: content of message
 
-        for b in MultiBotIRCClient.bots:
+        # Every connection of the account receives the whisper, one of them handles it for all bots
+        for b in self.factory.whisperBots:
             if b.nickname == args[0]:
                 b.handleWhisper(sender, args[1])
 
     def hostTarget(self, channel, target):
         """Track and update hosting status."""
         target = target.split(' ')[0]
-        for b in MultiBotIRCClient.bots:
-            if b.channel == channel:
-                b.setHost(channel, target)
+        for b in self.factory.channels.get(channel, ()):
+            b.setHost(channel, target)
 
     def clearChat(self, channel, target=None):
         """Log chat clear notices."""
@@ -1,18 +1,89 @@
 """Stores points and ranking for games using a database."""
+import bisect
 import json
 import math
-import sqlite3
+from collections import OrderedDict
+
+from twisted.internet import reactor
 
 from bot.paths import CONFIG_PATH, DATABASE_PATH
+from bot.utilities.database import ConnectionManager
+from bot.utilities.tools import is_callID_active
+
+DEFAULT_FLUSH_INTERVAL = 10     # max. seconds pending points are kept in memory
+DEFAULT_FLUSH_THRESHOLD = 200   # amount of viewers with pending points that forces a write
+
+MAX_SQL_VARIABLES = 500        # max. ids per "IN (...)" query, SQLite allows at least 999 variables
+STORED_CACHE_SIZE = 10000      # viewers whose stored points are kept in memory, the least recently used are dropped
+
+SQL_ADD_POINTS = """
+    INSERT INTO points (viewer_id, amount) VALUES (?, ?)
+    ON CONFLICT(viewer_id) DO UPDATE SET amount = amount + excluded.amount;
+    """
+
+
+class RankTable(object):
+    """Precomputed hearthstone rank thresholds: Rank_n needs base * factor^n points more than Rank_n+1.
+
+    Rank 0 means legend, the position of a legend is only known by the database (see Ranking.getRank).
+    """
+
+    def __init__(self, base, factor, ranks):
+        """Compute the minimum amount of (integer) points for every rank."""
+        self.ranks = ranks
+        self.thresholds = []    # thresholds[k]: min. points for rank ranks - k - 1, ascending
+
+        # Same float operations as subtracting the rank steps one by one, so results stay identical
+        steps = [base * math.pow(factor, k) for k in range(ranks)]
+        total = 0
+        for k in range(ranks):
+            threshold = math.floor(total)
+            while not self.__exceeds(threshold, steps[:k]):
+                threshold += 1
+            while self.__exceeds(threshold - 1, steps[:k]):
+                threshold -= 1
+            self.thresholds.append(threshold)
+            total += steps[k]
+
+    def __exceeds(self, points, steps):
+        """Return whether points are left after subtracting all steps."""
+        for step in steps:
+            points = points - step
+        return points > 0
+
+    def rank(self, points):
+        """Return the hearthstone rank for an amount of points, 0 for legend."""
+        return self.ranks - bisect.bisect_right(self.thresholds, points)
+
+    def isLegend(self, points):
+        """Return whether an amount of points is legend rank."""
+        return self.rank(points) == 0
+
+    def format(self, points, legendRank):
+        """Return the rank as string, legendRank is the position used for legends."""
+        rank = self.rank(points)
+        if rank > 0:
+            return str(rank)
+        else:
+            return str(legendRank) + " Legend"
 
 
 class Ranking():
-    """Manages spam points ranking."""
+    """Manages spam points ranking.
+
+    Point changes are collected in memory (self.pending, viewer_id -> delta) and written
+    to the database in a single transaction every 'points_flush_interval' seconds, or once
+    'points_flush_threshold' viewers have pending points. All reads include pending points.
+
+    The stored points of recently seen viewers are cached (self.stored), so point increments
+    and !rank only query the database the first time a viewer shows up. This class is the only
+    writer of the table, flush() keeps the cache up to date.
+    """
 
     def __init__(self, bot):
         """Set up connection to database and create tables if they do not yet exist."""
         self.bot = bot
-        self.connection = sqlite3.connect(DATABASE_PATH.format(bot.root))
+        self.db = ConnectionManager(DATABASE_PATH.format(bot.root))
         sql_create_command = """
             CREATE TABLE IF NOT EXISTS points (
             'viewer_id' INTEGER NOT NULL,
@@ -20,11 +91,9 @@ class Ranking():
             PRIMARY KEY('viewer_id')
             );
             """
-        self.cursor = self.connection.cursor()
-        self.cursor.execute(sql_create_command)
-        self.cursor.close()
-        self.connection.commit()
-        self.connection.close()
+        self.executeCommand(sql_create_command, [])
+        # Older databases get the index by db_migrate/db_migrate_amount_index_20261017.py, or here on first start
+        self.executeCommand("CREATE INDEX IF NOT EXISTS points_amount ON points (amount);", [])
 
         with open(CONFIG_PATH.format(bot.root), encoding="utf-8") as fp:
             CONFIG = json.load(fp)
@@ -32,36 +101,65 @@ class Ranking():
         self.BASE = CONFIG["ranking"]["base"]  # points from min rank to second min rank
         self.FACTOR = CONFIG["ranking"]["factor"]
         self.RANKS = CONFIG["ranking"]["ranks"]
+        self.rankTable = RankTable(self.BASE, self.FACTOR, self.RANKS)
+
+        self.flushInterval = CONFIG.get("points_flush_interval", DEFAULT_FLUSH_INTERVAL)
+        self.flushThreshold = CONFIG.get("points_flush_threshold", DEFAULT_FLUSH_THRESHOLD)
+        self.pending = {}
+        self.stored = OrderedDict()     # Maps viewer_id -> points in the database, None if there is no entry
+        self.callID = reactor.callLater(self.flushInterval, self.__flushLoop)
 
     def _get_user_id(self, username):
-        return self.bot.getuserID(username)
+        # ids are stored as INTEGER, use the same type for the pending points
+        return int(self.bot.getuserID(username))
 
     def getPoints(self, username, new_entry=False):
         """Get the points of a user."""
         username = username.lower()
-        viewer_id = self._get_user_id(username)
+        return self.getPointsOfID(self._get_user_id(username), new_entry)
 
-        sql_command = "SELECT amount FROM points WHERE viewer_id = ?;"
+    def getPointsAsync(self, username):
+        """Return a Deferred firing with the points of a user, the user id may need an API call.
+
+        Fails with UserNotFoundError if there is no such user.
+        """
+        d = self.bot.getuserIDAsync(username.lower())
+        d.addCallback(lambda viewer_id: self.getPointsOfID(int(viewer_id)))
+        return d
 
-        cursor, connection = self.executeCommandGetConnection(sql_command, (viewer_id, ))
-        one = cursor.fetchone()
+    def getPointsOfID(self, viewer_id, new_entry=False):
+        """Get the points of a viewer id, see getPoints()."""
+        stored = self.getStoredPoints(viewer_id)
 
-        if(one is None):
+        if(stored is None):
             output = 0
 
-            # initialization for user first talking in chat
-            # Currently only expect incrementPoints() to gives the new_entry flag
+            # Only insert entries when explicitly asked for,
             # this way we prevent inserting random entries to db by !rank something
             if new_entry:
-                sql_command = "INSERT INTO points (viewer_id, amount) VALUES (?, 0);"
-                cursor.execute(sql_command, (viewer_id, ))
-                connection.commit()
+                sql_command = "INSERT OR IGNORE INTO points (viewer_id, amount) VALUES (?, 0);"
+                self.executeCommand(sql_command, (viewer_id, ))
+                self.stored[viewer_id] = 0
         else:
-            output = one[0]
+            output = stored
+
+        return output + self.pending.get(viewer_id, 0)
+
+    def getStoredPoints(self, viewer_id):
+        """Get the points of a viewer stored in the database, without pending points.
 
-        cursor.close()
-        connection.close()
-        return output
+        Return None if the viewer has no entry.
+        """
+        if viewer_id in self.stored:
+            self.stored.move_to_end(viewer_id)
+            return self.stored[viewer_id]
+
+        sql_command = "SELECT amount FROM points WHERE viewer_id = ?;"
+        one = self.executeQuery(sql_command, (viewer_id, ), fetchall=False)
+        self.stored[viewer_id] = None if one is None else one[0]
+        if len(self.stored) > STORED_CACHE_SIZE:
+            self.stored.popitem(last=False)
+        return self.stored[viewer_id]
 
     def incrementPoints(self, username, amount, bot):
         """Increment points of a user by a certain value.
@@ -71,71 +169,104 @@ class Ranking():
         username = username.lower()
         viewer_id = self._get_user_id(username)
 
-        points = int(self.getPoints(username, new_entry=True))
+        points = self.getPoints(username) + amount
+        self.pending[viewer_id] = self.pending.get(viewer_id, 0) + amount
+
+        """Check for legend rank if user was not legend before."""
+        if not self.rankTable.isLegend(points - amount) and self.rankTable.isLegend(points):
+            rank = self.getHSRank(points)
+            var = {"<USER>": bot.displayName(username), "<RANK>": rank}
+            bot.write(bot.replace_vars(bot.responses["ranking"]["msg_legend"]["msg"], var))
+
+        if len(self.pending) >= self.flushThreshold:
+            self.flush()
 
-        rank = self.getHSRank(points)
-        legend = "Legend" in rank
+    def flush(self):
+        """Write all pending points to the database in one transaction."""
+        if not self.pending:
+            return
 
-        points += amount
+        pending = self.pending
+        self.pending = {}
+        connection = self.db.get()
+        with connection:
+            connection.executemany(SQL_ADD_POINTS, list(pending.items()))
 
-        sql_command = "UPDATE points SET amount = ? WHERE viewer_id = ?;"
-        self.executeCommand(sql_command, [points, viewer_id])
+        # Cached viewers have their entry now, the others are read again when needed
+        for viewer_id, delta in pending.items():
+            if viewer_id in self.stored:
+                self.stored[viewer_id] = (self.stored[viewer_id] or 0) + delta
 
-        """Check for legend rank if user was not legend before."""
-        if not legend:
-            rank = self.getHSRank(points)
-            if "Legend" in rank:
-                var = {"<USER>": bot.displayName(username), "<RANK>": rank}
-                bot.write(bot.replace_vars(bot.responses["ranking"]["msg_legend"]["msg"], var))
+    def __flushLoop(self):
+        """Periodically write pending points."""
+        self.flush()
+        self.callID = reactor.callLater(self.flushInterval, self.__flushLoop)
 
     def getRank(self, points):
         """Get the absolute for a certain amount of points."""
-        sql_command = "SELECT * FROM points WHERE amount > ?;"
-        cursor, connection = self.executeCommandGetConnection(sql_command, [points])
+        # Uses the index on amount, only the entries above points are counted
+        sql_command = "SELECT COUNT(*) FROM points WHERE amount > ?;"
+        count = self.executeQuery(sql_command, [points], fetchall=False)[0]
+        return count + self.__pendingRankOffset(points) + 1
+
+    def __pendingRankOffset(self, points):
+        """Return how many viewers more (or less) have more than points, once pending points are included."""
+        offset = 0
+        stored = {viewer_id: self.stored[viewer_id] for viewer_id in self.pending
+                  if self.stored.get(viewer_id) is not None}
+        stored.update(self.getStoredPointsOf([viewer_id for viewer_id in self.pending if viewer_id not in self.stored]))
+        for viewer_id, delta in self.pending.items():
+            before = viewer_id in stored and stored[viewer_id] > points
+            after = stored.get(viewer_id, 0) + delta > points
+            offset += after - before
+        return offset
 
-        all = cursor.fetchall()
-        cursor.close()
-        connection.close()
-        return len(all) + 1
+    def getStoredPointsOf(self, viewer_ids):
+        """Return a dict of viewer_id -> points stored in the database, for viewers that have an entry."""
+        stored = {}
+        for i in range(0, len(viewer_ids), MAX_SQL_VARIABLES):
+            chunk = viewer_ids[i:i + MAX_SQL_VARIABLES]
+            sql_command = "SELECT viewer_id, amount FROM points WHERE viewer_id IN ({});".format(",".join("?" * len(chunk)))
+            stored.update(self.executeQuery(sql_command, chunk))
+        return stored
 
     def getTopSpammers(self, n):
         """Get the n top spammers."""
-        sql_command = "SELECT * FROM points ORDER BY amount DESC;"
-        cursor, connection = self.executeCommandGetConnection(sql_command, [])
-        all = cursor.fetchall()
-
-        return all[:n]
+        self.flush()
+        sql_command = "SELECT viewer_id, amount FROM points ORDER BY amount DESC LIMIT ?;"
+        return self.executeQuery(sql_command, [n])
 
     def getHSRank(self, points):
         """Return spam rank of a user in hearthstone units."""
-        p = points
-        rank = self.RANKS
-        while p > 0 and rank > 0:
-            p = p - self.BASE * math.pow(self.FACTOR, (self.RANKS - rank))
-            rank = rank - 1
-
-        if rank > 0:
-            return str(rank)
+        if self.rankTable.isLegend(points):
+            return self.rankTable.format(points, self.getRank(points))
         else:
-            return str(self.getRank(points)) + " Legend"
+            return self.rankTable.format(points, None)
 
-    def executeCommandGetConnection(self, sql_command, args):
-        """Execute a command and return the cursor and connection.
+    def executeQuery(self, sql_command, args, fetchall=True):
+        """Execute a read only command and return its output.
 
-        Use this if you need the output of the command, or need the cursor and connection.
-        Since different threads will try to access this method, a connection has to be reopened everytime.
+        Returns a list of all rows, or only the first row (None if there is none) if fetchall is False.
+        Uses the connection of the calling thread, which is kept open.
         """
-        connection = sqlite3.connect(DATABASE_PATH.format(self.bot.root))
-        cursor = connection.cursor()
-        cursor.execute(sql_command, args)
-        connection.commit()
-        return cursor, connection
+        cursor = self.db.get().execute(sql_command, args)
+        try:
+            return cursor.fetchall() if fetchall else cursor.fetchone()
+        finally:
+            cursor.close()
 
     def executeCommand(self, sql_command, args):
-        """Execute an sql command and closes all connections.
+        """Execute an sql command and commit it.
 
         Does not return output.
         """
-        cursor, connection = self.executeCommandGetConnection(sql_command, args)
-        cursor.close()
-        connection.close()
+        connection = self.db.get()
+        with connection:
+            connection.execute(sql_command, args)
+
+    def close(self):
+        """Write pending points and close all database connections."""
+        if is_callID_active(self.callID):
+            self.callID.cancel()
+        self.flush()
+        self.db.close()
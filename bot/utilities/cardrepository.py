@@ -0,0 +1,82 @@
+"""Contains the Hearthstone cards, indexed for the card commands."""
+import random
+import threading
+from collections import defaultdict
+
+from bot.utilities.lazyresource import LazyResource
+from bot.utilities.spellcorrection import SymSpellCorrection
+
+# Attributes the GuessMinionGame gives clues about
+CLUE_ATTRIBUTES = ('cardClass', 'set', 'name', 'rarity', 'attack', 'cost', 'health')
+
+
+class CardRepository(object):
+    """Hearthstone cards from hearthstonejson.com, indexed once for lookups.
+
+    Use getRepository(), so all bots share the repository of the same card list.
+    """
+
+    def __init__(self, cards):
+        """Build the indices."""
+        self.cards = cards
+        self.byName = {}
+        self.byLowerName = {}
+        self.byType = defaultdict(list)
+        self.clues = {}     # Maps minion name -> attributes it has of CLUE_ATTRIBUTES
+        for card in cards:
+            name = card.get('name')
+            if not name:
+                continue
+            self.byName.setdefault(name, card)
+            self.byLowerName.setdefault(name.lower(), card)
+            self.byType[card.get('type')].append(card)
+
+        self.minions = self.byType['MINION']
+        self.spells = self.byType['SPELL']
+        self.weapons = self.byType['WEAPON']
+        self.heroes = self.byType['HERO']
+        for minion in self.minions:
+            self.clues[minion['name']] = [stat for stat in CLUE_ATTRIBUTES if stat in minion]
+
+        # Building the index takes a while for all cards, so it's built in a thread of the reactor
+        self.spelling = LazyResource(lambda: SymSpellCorrection(set(self.byLowerName)), "card spell correction")
+        self.spelling.preload()
+
+    def get(self, name):
+        """Return the card called name, ignoring case, or None."""
+        card = self.byName.get(name)
+        if card is None:
+            card = self.byLowerName.get(name.lower())
+        return card
+
+    def find(self, name, popularity=None):
+        """Return the card called name, or the closest one if it is misspelled, or None.
+
+        Of equally close cards the most popular is returned, popularity maps lowercase names to numbers.
+        Misspelled names are only found once the spell correction is built.
+        """
+        card = self.get(name)
+        if card is None and self.spelling.ready():
+            correction = self.spelling.get().spell(name, popularity)
+            if correction:
+                card = self.byLowerName[correction]
+        return card
+
+    def randomMinion(self):
+        """Return a random minion, or None if there are no cards."""
+        return random.choice(self.minions) if self.minions else None
+
+
+repositories = {}   # Maps id of a card list -> (card list, repository)
+repositoriesLock = threading.Lock()
+
+
+def getRepository(cards):
+    """Return the CardRepository of cards, built only once per card list."""
+    with repositoriesLock:
+        cached = repositories.get(id(cards))
+        if cached is None or cached[0] is not cards:
+            # Keep only the newest list, older ones are gone from the cache
+            repositories.clear()
+            cached = repositories[id(cards)] = (cards, CardRepository(cards))
+        return cached[1]
@@ -0,0 +1,43 @@
+"""Contains a manager for long living sqlite connections."""
+import sqlite3
+import threading
+
+STATEMENT_CACHE_SIZE = 64   # prepared statements kept per connection
+
+
+class ConnectionManager(object):
+    """Hands out one sqlite connection per thread, which stays open until close() is called.
+
+    Connections use WAL journaling, so reads from other threads (e.g. the web api) don't
+    block the writes of the bot and commits don't need a full fsync of the database.
+    """
+
+    def __init__(self, path):
+        """Initialize variables, connections are opened on first use."""
+        self.path = path
+        self.local = threading.local()
+        self.connections = []
+        self.lock = threading.Lock()
+
+    def get(self):
+        """Return the connection of the calling thread."""
+        connection = getattr(self.local, 'connection', None)
+        if connection is None:
+            # check_same_thread is disabled, so close() can be called from any thread.
+            # Apart from that a connection is only ever used by the thread that opened it.
+            connection = sqlite3.connect(self.path, cached_statements=STATEMENT_CACHE_SIZE,
+                                         check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL;")
+            connection.execute("PRAGMA synchronous=NORMAL;")
+            self.local.connection = connection
+            with self.lock:
+                self.connections.append(connection)
+        return connection
+
+    def close(self):
+        """Close all connections."""
+        with self.lock:
+            for connection in self.connections:
+                connection.close()
+            self.connections = []
+        self.local = threading.local()
@@ -0,0 +1,109 @@
+"""Contains the on-disk tier of the web cache."""
+import hashlib
+import json
+import logging
+import os
+import threading
+from datetime import datetime
+
+from bot.paths import COMMON_API_JSON_DATA_PATH, JSON_FILE_INDEX_PATH
+from bot.utilities.tools import dumpJSONAtomic
+
+
+class DiskCache(object):
+    """Stores processed API payloads on disk, so bots start warm after a restart or without network.
+
+    Every url gets one json file with its payload. The index file maps urls to
+    {"file", "timestamp", "etag", "last_modified"}, the validators are used to revalidate
+    the payload with a conditional request instead of downloading it again.
+    """
+
+    def __init__(self, dataPath=COMMON_API_JSON_DATA_PATH, indexPath=JSON_FILE_INDEX_PATH):
+        """Initialize variables, the index is read on first use."""
+        self.dataPath = dataPath
+        self.indexPath = indexPath
+        self.index = None
+        self.lock = threading.Lock()
+
+    def __loadIndex(self):
+        """Read the index file, has to be called with the lock held."""
+        if self.index is None:
+            try:
+                with open(self.indexPath, encoding="utf-8") as file:
+                    self.index = json.load(file)
+            except FileNotFoundError:
+                self.index = {}
+            except ValueError:
+                logging.warning("Cache index {} is damaged, starting with an empty cache.".format(self.indexPath))
+                self.index = {}
+        return self.index
+
+    def get(self, url):
+        """Return (data, timestamp, validators) stored for url, None if there is nothing."""
+        with self.lock:
+            entry = self.__loadIndex().get(url)
+        if entry is None:
+            return None
+
+        try:
+            with open(self.dataPath.format(entry["file"]), encoding="utf-8") as file:
+                data = json.load(file)
+        except (OSError, ValueError):
+            logging.warning("Cached data of {} could not be read.".format(url))
+            return None
+
+        validators = {"etag": entry.get("etag"), "last_modified": entry.get("last_modified")}
+        return data, datetime.fromtimestamp(entry["timestamp"]), validators
+
+    def store(self, url, data, timestamp, validators=None):
+        """Write data of url to disk."""
+        fileName = hashlib.sha1(url.encode("utf-8")).hexdigest() + ".json"
+        try:
+            os.makedirs(os.path.dirname(self.dataPath.format(fileName)), exist_ok=True)
+            dumpJSONAtomic(data, self.dataPath.format(fileName))
+        except (OSError, TypeError, ValueError):
+            logging.warning("Data of {} could not be written to the disk cache.".format(url))
+            return
+
+        self.__updateIndex(url, {"file": fileName}, timestamp, validators)
+
+    def touch(self, url, timestamp, validators=None):
+        """Mark the stored data of url as fresh, after the server confirmed it didn't change."""
+        self.__updateIndex(url, {}, timestamp, validators)
+
+    def remove(self, url):
+        """Forget the stored data of url."""
+        with self.lock:
+            index = self.__loadIndex()
+            entry = index.pop(url, None)
+            if entry is None:
+                return
+            try:
+                dumpJSONAtomic(index, self.indexPath)
+                os.remove(self.dataPath.format(entry["file"]))
+            except FileNotFoundError:
+                pass
+            except OSError:
+                logging.warning("Data of {} could not be removed from the disk cache.".format(url))
+
+    def __updateIndex(self, url, entry, timestamp, validators):
+        """Update the index entry of url and write the index."""
+        validators = validators or {}
+        with self.lock:
+            index = self.__loadIndex()
+            if not entry and url not in index:
+                return
+            entry = dict(index.get(url, {}), **entry)
+            entry["timestamp"] = timestamp.timestamp()
+            entry["etag"] = validators.get("etag")
+            entry["last_modified"] = validators.get("last_modified")
+            index[url] = entry
+            try:
+                os.makedirs(os.path.dirname(self.indexPath), exist_ok=True)
+                dumpJSONAtomic(index, self.indexPath)
+            except OSError:
+                logging.warning("Cache index {} could not be written.".format(self.indexPath))
+
+
+# All bots of the process share the same files
+disk = DiskCache()
@@ -0,0 +1,63 @@
+"""Contains a lookup index over all emotes and emojis usable in a channel."""
+from datetime import datetime
+from enum import Enum
+
+from bot.utilities.vocabulary import EmoteSet, vocabulary
+
+
+class EmoteSource(Enum):
+    """Where an emote comes from."""
+
+    TWITCH = 1
+    BTTV = 2
+    FFZ = 3
+    EMOJI = 4
+
+
+class EmoteIndex(object):
+    """Read-only index over the emotes of a channel, for O(1) membership checks.
+
+    An index is built from the emote lists of a WebCache and stays valid until one of
+    those cache entries expires or the cache stores new data. The sets are EmoteSets of
+    the shared vocabulary, so the sets of global emotes are shared by all channels.
+    """
+
+    def __init__(self, twitch, bttv, ffz, emojis, cache=None, version=None, expires=None):
+        """Build the index from EmoteSets or lists of emote names."""
+        self.twitch = toEmoteSet(twitch)
+        self.bttv = toEmoteSet(bttv)
+        self.ffz = toEmoteSet(ffz)
+        self.emojis = toEmoteSet(emojis)
+
+        # Same content as bot.getEmotes(), emojis are not included
+        self.emotes = self.twitch | self.bttv | self.ffz
+        self.nonTwitchEmotes = self.bttv | self.ffz
+
+        self.cache = cache
+        self.version = version
+        self.expires = expires
+
+    def __contains__(self, word):
+        """Return whether word is an emote (emojis excluded)."""
+        return word in self.emotes
+
+    def source(self, word):
+        """Return the EmoteSource of an emote or emoji, None if word is neither.
+
+        Twitch emotes win on name clashes, then bttv, then ffz.
+        """
+        for source, names in [(EmoteSource.TWITCH, self.twitch), (EmoteSource.BTTV, self.bttv),
+                              (EmoteSource.FFZ, self.ffz), (EmoteSource.EMOJI, self.emojis)]:
+            if word in names:
+                return source
+        return None
+
+    def isValid(self, cache):
+        """Return whether this index still reflects the content of cache."""
+        return (cache is self.cache and cache.version == self.version and
+                self.expires is not None and datetime.now() < self.expires)
+
+
+def toEmoteSet(names):
+    """Return names as EmoteSet of the shared vocabulary."""
+    return names if isinstance(names, EmoteSet) else vocabulary.emoteSet(names)
@@ -0,0 +1,77 @@
+"""Contains the HTTP client shared by all bots."""
+import logging
+
+import requests
+from requests.adapters import HTTPAdapter
+from twisted.internet import defer, threads
+from twisted.python.failure import Failure
+
+DEFAULT_TIMEOUT = 10    # seconds, for connecting and for reading
+POOL_SIZE = 20          # keep-alive connections per host
+
+
+class HTTPClient(object):
+    """HTTP client with one pooled keep-alive session and timeouts for all requests.
+
+    get() / getJSON() block and are meant for code running outside of the reactor
+    (startup, web api, worker threads). getJSONAsync() runs the request in the reactor
+    thread pool and returns a Deferred, so chat processing never waits for the network.
+    Identical async requests which are in flight at the same time share one HTTP request.
+    """
+
+    def __init__(self, timeout=DEFAULT_TIMEOUT, poolSize=POOL_SIZE):
+        """Set up the session."""
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=poolSize, pool_maxsize=poolSize)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        # Maps (url, headers) -> list of Deferreds waiting for the running request
+        # Only accessed from the reactor thread.
+        self.inflight = {}
+
+    def get(self, url, headers=None, timeout=None):
+        """Send a GET request and return the response."""
+        return self.session.get(url, headers=headers, timeout=timeout or self.timeout)
+
+    def getJSON(self, url, headers=None, timeout=None):
+        """Send a GET request and return the parsed JSON.
+
+        Raises RequestException for connection problems and 4xx/5xx responses,
+        ValueError if the response is no JSON.
+        """
+        r = self.get(url, headers=headers, timeout=timeout)
+        r.raise_for_status()
+        return r.json()
+
+    def getJSONAsync(self, url, headers=None, timeout=None):
+        """Return a Deferred firing with the parsed JSON of url, or failing like getJSON().
+
+        Has to be called from the reactor thread.
+        """
+        key = (url, tuple(sorted((headers or {}).items())))
+        d = defer.Deferred()
+
+        if key in self.inflight:
+            self.inflight[key].append(d)
+            return d
+
+        self.inflight[key] = [d]
+        request = threads.deferToThread(self.getJSON, url, headers, timeout)
+        request.addBoth(self.__finish, key)
+        return d
+
+    def __finish(self, result, key):
+        """Hand the result of a request to everyone waiting for it. The result is shared, don't modify it."""
+        for d in self.inflight.pop(key, []):
+            if isinstance(result, Failure):
+                d.errback(result)
+            else:
+                d.callback(result)
+        if isinstance(result, Failure):
+            logging.info("Async request failed: {}".format(result.getErrorMessage()))
+
+
+# Shared by every bot of the process, so connections to the same hosts get reused
+client = HTTPClient()
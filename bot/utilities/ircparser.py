@@ -0,0 +1,61 @@
+"""Contains a single pass parser for Twitch IRC lines with IRCv3 tags."""
+import re
+
+from twisted.words.protocols.irc import IRCBadMessage, numeric_to_symbolic
+
+# http://ircv3.net/specs/core/message-tags-3.2.html#escaping-values
+TAG_ESCAPE = re.compile(r'\\(.?)', re.S)
+TAG_ESCAPES = {':': ';', 's': ' ', '\\': '\\', 'r': '\r', 'n': '\n'}
+
+
+def unescapeTag(value):
+    """Unescape a tag value, unknown escapes lose their backslash."""
+    return TAG_ESCAPE.sub(lambda m: TAG_ESCAPES.get(m.group(1), m.group(1)), value)
+
+
+def parseTags(s):
+    """Return the dict of a tag string like 'badges=;color=#FF0000;display-name=Bob'.
+
+    Only values containing a backslash are unescaped, which are very few.
+    """
+    tags = {}
+    for tag in s.split(';'):
+        key, _, value = tag.partition('=')
+        if '\\' in value:
+            value = unescapeTag(value)
+        tags[key] = value
+    return tags
+
+
+def parseLine(line):
+    """Parse a line as received from the server (bytes) into (tags, prefix, command, params).
+
+    The command is upper case with numerics converted like twisted does, e.g. 'PRIVMSG' or
+    'RPL_WELCOME'. The last parameter of lines like 'PRIVMSG #channel :message' is the message.
+    Raises IRCBadMessage for lines which can't be parsed.
+    """
+    try:
+        start = 0
+        tags = {}
+        if line[:1] == b'@':
+            start = line.index(b' ') + 1
+            tags = parseTags(line[1:start - 1].decode('utf-8'))
+
+        prefix = ''
+        if line[start:start + 1] == b':':
+            end = line.index(b' ', start)
+            prefix = line[start + 1:end].decode('utf-8')
+            start = end + 1
+
+        trailing = line.find(b' :', start)
+        if trailing != -1:
+            params = line[start:trailing].decode('utf-8').split()
+            params.append(line[trailing + 2:].decode('utf-8'))
+        else:
+            params = line[start:].decode('utf-8').split()
+
+        command = params.pop(0)
+    except (ValueError, IndexError):
+        raise IRCBadMessage("Can't parse line {!r}".format(line))
+
+    return tags, prefix, numeric_to_symbolic.get(command, command), params
@@ -0,0 +1,51 @@
+"""Contains a holder for resources which are expensive to build."""
+import logging
+import threading
+
+from twisted.internet import reactor
+
+
+class LazyResource(object):
+    """A resource which is only built when it is used for the first time.
+
+    Commands use this for data which is expensive to compute or keep in memory, so
+    startup stays fast and channels which never use the command don't pay for it.
+    """
+
+    def __init__(self, factory, name="resource"):
+        """Remember the factory, it is called without arguments to build the resource."""
+        self.factory = factory
+        self.name = name
+        self.value = None
+        self.loaded = False
+        self.loading = False
+        self.lock = threading.Lock()
+
+    def get(self):
+        """Return the resource, build it first if necessary. Blocks while it is built in the background."""
+        if not self.loaded:
+            with self.lock:
+                if not self.loaded:
+                    logging.info("Loading {}".format(self.name))
+                    self.value = self.factory()
+                    self.loaded = True
+        return self.value
+
+    def ready(self):
+        """Return whether the resource is built."""
+        return self.loaded
+
+    def preload(self):
+        """Build the resource in a thread of the reactor, if it isn't built or being built yet."""
+        with self.lock:
+            if self.loaded or self.loading:
+                return
+            self.loading = True
+        reactor.callInThread(self.__build)
+
+    def __build(self):
+        """Build the resource, for preload()."""
+        try:
+            self.get()
+        finally:
+            self.loading = False
@@ -0,0 +1,138 @@
+"""Contains the outbound message queue of an account, which keeps within Twitch's rate limits."""
+import logging
+from collections import deque
+
+from twisted.internet import reactor
+
+from bot.utilities.ratelimit import TokenBucket
+from bot.utilities.tools import is_callID_active
+
+# Lanes, lower numbers are sent first
+PRIORITY_MODERATION = 0
+PRIORITY_WHISPER = 1
+PRIORITY_CHAT = 2
+PRIORITIES = (PRIORITY_MODERATION, PRIORITY_WHISPER, PRIORITY_CHAT)
+
+# https://dev.twitch.tv/docs/irc#irc-command-and-message-limits
+LIMIT_PERIOD = 30       # seconds
+USER_LIMIT = 20         # messages per period in channels the account doesn't moderate
+MODERATOR_LIMIT = 100   # messages per period in total, if the account is a moderator
+CHANNEL_PERIOD = 1.5    # seconds between messages in a channel the account doesn't moderate
+DUPLICATE_PERIOD = 30   # seconds Twitch rejects an identical message in channels the account doesn't moderate
+QUEUE_WARNING = 50      # queued messages, above which a warning is logged
+
+
+class OutboundQueue(object):
+    """Sends the messages of one account, at most as fast as Twitch allows.
+
+    Token buckets hold half of a limit and refill the other half over its period, so a
+    burst followed by refills never exceeds the limit within any period. The account
+    bucket is used by every message, the user bucket and a bucket per channel only by
+    messages in channels the account doesn't moderate. Messages wait in priority lanes,
+    moderation actions first, and messages already waiting or which Twitch would reject
+    as duplicates are dropped.
+    """
+
+    def __init__(self, nickname):
+        """Initialize variables."""
+        self.nickname = nickname
+        self.accountBucket = TokenBucket(MODERATOR_LIMIT // 2, LIMIT_PERIOD)
+        self.userBucket = TokenBucket(USER_LIMIT // 2, LIMIT_PERIOD)
+        self.channelBuckets = {}
+        self.moderated = set()      # channels in which the account is a moderator
+        self.lanes = [deque() for _ in PRIORITIES]     # (time queued, factory, channel, msg)
+        self.queued = set()         # (channel, msg) waiting in the lanes
+        self.recent = {}            # (channel, msg) -> time sent
+        self.callID = None
+        self.stats = {'sent': 0, 'duplicates': 0, 'delayed': 0, 'maxDepth': 0, 'waited': 0.0}
+
+    def isModerator(self, channel):
+        """Return whether the account moderates channel, broadcasters do."""
+        return channel in self.moderated or channel[1:] == self.nickname
+
+    def setModerator(self, channel, moderator):
+        """Update whether the account moderates channel, e.g. from a USERSTATE."""
+        if moderator:
+            self.moderated.add(channel)
+        else:
+            self.moderated.discard(channel)
+
+    def depth(self):
+        """Return the number of waiting messages."""
+        return sum(len(lane) for lane in self.lanes)
+
+    def send(self, factory, channel, msg, priority=PRIORITY_CHAT):
+        """Queue msg for channel, it is sent over the connection of factory. Return whether it was queued."""
+        now = reactor.seconds()
+        key = (channel, msg)
+        if key in self.queued or (not self.isModerator(channel) and now - self.recent.get(key, now - DUPLICATE_PERIOD) < DUPLICATE_PERIOD):
+            self.stats['duplicates'] += 1
+            logging.info("[{}] Dropped duplicate message: {}".format(channel, msg))
+            return False
+
+        self.lanes[priority].append((now, factory, channel, msg))
+        self.queued.add(key)
+        depth = self.depth()
+        self.stats['maxDepth'] = max(self.stats['maxDepth'], depth)
+        if depth == QUEUE_WARNING:
+            logging.warning("{} messages of {} are waiting for the rate limit".format(depth, self.nickname))
+        self.drain(now)
+        return True
+
+    def drain(self, now=None):
+        """Send all messages the limits allow and schedule the next attempt for the rest."""
+        if now is None:
+            now = reactor.seconds()
+        wait = None
+        for i, lane in enumerate(self.lanes):
+            waiting = deque()
+            for item in lane:
+                queued, factory, channel, msg = item
+                delay = self.delay(now, factory, channel)
+                if delay == 0:
+                    self.deliver(now, item)
+                else:
+                    waiting.append(item)
+                    if delay is not None:
+                        wait = delay if wait is None else min(wait, delay)
+            self.lanes[i] = waiting
+
+        if wait is not None and not is_callID_active(self.callID):
+            self.callID = reactor.callLater(wait, self.drain)
+
+        if len(self.recent) > 1000:
+            self.recent = {key: sent for key, sent in self.recent.items() if now - sent < DUPLICATE_PERIOD}
+
+    def delay(self, now, factory, channel):
+        """Return the seconds until a message for channel can be sent, None while not connected."""
+        if factory.client is None:
+            return None
+        buckets = [self.accountBucket]
+        if not self.isModerator(channel):
+            if channel not in self.channelBuckets:
+                self.channelBuckets[channel] = TokenBucket(1, CHANNEL_PERIOD)
+            buckets += [self.userBucket, self.channelBuckets[channel]]
+        return max(bucket.wait(now) for bucket in buckets)
+
+    def deliver(self, now, item):
+        """Send a message, delay() has to be 0 for it."""
+        queued, factory, channel, msg = item
+        self.accountBucket.take()
+        if not self.isModerator(channel):
+            self.userBucket.take()
+            self.channelBuckets[channel].take()
+
+        key = (channel, msg)
+        self.queued.discard(key)
+        self.recent[key] = now
+        self.stats['sent'] += 1
+        if now > queued:
+            self.stats['delayed'] += 1
+            self.stats['waited'] += now - queued
+        factory.client.deliver(channel, msg)
+
+    def getStats(self):
+        """Return the counters and the current depth of every lane."""
+        stats = dict(self.stats)
+        stats['depth'] = [len(lane) for lane in self.lanes]
+        return stats
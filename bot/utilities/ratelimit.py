@@ -0,0 +1,81 @@
+"""Contains a rate limiter driven by the reactor."""
+from collections import deque
+
+from twisted.internet import reactor
+
+from bot.utilities.tools import is_callID_active
+
+
+class RateLimiter(object):
+    """Runs queued calls in order, at most limit calls in any period seconds.
+
+    Calls which are within the limit run immediately, the others are run by the
+    reactor as soon as the oldest call of the window is period seconds old.
+    """
+
+    def __init__(self, limit, period):
+        """Initialize variables."""
+        self.limit = limit
+        self.period = period
+        self.sent = deque()     # times of the calls in the current window
+        self.queue = deque()    # (function, args) waiting to be run
+        self.callID = None
+
+    def call(self, function, *args):
+        """Run function(*args) now, or later if the limit is reached."""
+        self.queue.append((function, args))
+        self.__drain()
+
+    def pending(self):
+        """Return the number of calls waiting."""
+        return len(self.queue)
+
+    def clear(self):
+        """Drop all waiting calls."""
+        self.queue.clear()
+        if is_callID_active(self.callID):
+            self.callID.cancel()
+
+    def __drain(self):
+        """Run as many waiting calls as the limit allows and schedule the rest."""
+        now = reactor.seconds()
+        while self.sent and now - self.sent[0] >= self.period:
+            self.sent.popleft()
+
+        while self.queue and len(self.sent) < self.limit:
+            function, args = self.queue.popleft()
+            self.sent.append(now)
+            function(*args)
+
+        if self.queue and not is_callID_active(self.callID):
+            self.callID = reactor.callLater(self.period - (now - self.sent[0]), self.__drain)
+
+
+class TokenBucket(object):
+    """Holds up to capacity tokens, which refill evenly at capacity per period seconds."""
+
+    def __init__(self, capacity, period):
+        """Start with a full bucket."""
+        self.capacity = capacity
+        self.rate = capacity / period
+        self.tokens = capacity
+        self.time = reactor.seconds()
+
+    def refill(self, now):
+        """Add the tokens which refilled until now."""
+        self.tokens = min(self.capacity, self.tokens + (now - self.time) * self.rate)
+        self.time = now
+
+    def ready(self, now):
+        """Return whether a token is available."""
+        self.refill(now)
+        return self.tokens >= 1
+
+    def take(self):
+        """Use a token, ready() has to be checked first."""
+        self.tokens -= 1
+
+    def wait(self, now):
+        """Return the seconds until a token is available."""
+        self.refill(now)
+        return max(0, (1 - self.tokens) / self.rate)
@@ -35,6 +35,123 @@ class SpellCorrection(object):
         return {w.lower() for w in words} & self.words
 
 
+class SymSpellCorrection(object):
+    """Corrects a word based on given set of words, using a precomputed deletion index.
+
+    Finds the same corrections as SpellCorrection, words at most two typos away, but the
+    index is built once per word set, so a lookup only generates the deletes of the word
+    instead of all its double typos. Candidates are ranked by distance, then popularity,
+    then alphabetically. See https://github.com/wolfgarbe/SymSpell
+    """
+
+    def __init__(self, words, popularity=None, maxDistance=2, prefixLength=7):
+        """Build the index: every delete of the prefix of a word -> words.
+
+        popularity maps words to a number, it is read at lookup time so it can be updated.
+        """
+        self.words = words
+        self.popularity = popularity if popularity is not None else {}
+        self.maxDistance = maxDistance
+        self.prefixLength = prefixLength
+        self.index = {}
+        for word in words:
+            for delete in self.deletes(word[:prefixLength]):
+                self.index.setdefault(delete, []).append(word)
+
+    def deletes(self, word):
+        """Return word and all strings with up to maxDistance characters deleted from it."""
+        result = {word}
+        edits = {word}
+        for _ in range(self.maxDistance):
+            edits = {w[:i] + w[i + 1:] for w in edits for i in range(len(w))}
+            result |= edits
+        return result
+
+    def lookup(self, word, popularity=None):
+        """Return all words at most maxDistance typos away from word, best first.
+
+        popularity replaces the one given to the constructor for this lookup.
+        """
+        word = word.lower()
+        if popularity is None:
+            popularity = self.popularity
+        if word in self.words:
+            return [word]
+
+        candidates = set()
+        for delete in self.deletes(word[:self.prefixLength]):
+            candidates.update(self.index.get(delete, ()))
+
+        ranked = []
+        for candidate in candidates:
+            if abs(len(candidate) - len(word)) > self.maxDistance:
+                continue
+            d = distance(word, candidate, self.maxDistance)
+            if d <= self.maxDistance:
+                ranked.append((d, -popularity.get(candidate, 0), candidate))
+        ranked.sort()
+        return [candidate for _, _, candidate in ranked]
+
+    def spell(self, word, popularity=None):
+        """Return lowercase correction of word.
+
+        If no such word exists, returns False instead.
+        """
+        corrections = self.lookup(word, popularity)
+        return corrections[0] if corrections else False
+
+    def known(self, words):
+        """{'Gazpacho', 'gazzpacho'} => {'gazpacho'}."""
+        return {w.lower() for w in words} & self.words
+
+
+def distance(a, b, maxDistance):
+    """Return the number of typos (deletes, inserts, replaces, transposes) between a and b.
+
+    Like Word.double_typos(), typos may overlap, e.g. 'ca' -> 'ac' -> 'abc' are two typos.
+    Returns maxDistance + 1 as soon as it is clear the distance is larger.
+    """
+    # Typos are usually in one place, the common start and end don't change the distance
+    start = 0
+    while start < len(a) and start < len(b) and a[start] == b[start]:
+        start += 1
+    end = 0
+    while end < len(a) - start and end < len(b) - start and a[-1 - end] == b[-1 - end]:
+        end += 1
+    a = a[start:len(a) - end]
+    b = b[start:len(b) - end]
+    if not a or not b:
+        return min(len(a) + len(b), maxDistance + 1)
+
+    # Damerau-Levenshtein distance by Lowrance and Wagner, row i + 1 is for a[:i]
+    infinity = len(a) + len(b)
+    rows = [[infinity] * (len(b) + 2), [infinity] + list(range(len(b) + 1))]
+    last = {}   # character -> last row of a it was in
+    for i in range(1, len(a) + 1):
+        # Cells with |i - j| > maxDistance are larger than maxDistance, they are not computed
+        row = [infinity] * (len(b) + 2)
+        row[1] = i
+        previous = rows[i]
+        first = max(1, i - maxDistance)
+        lastColumn = b.rfind(a[i - 1], 0, first - 1) + 1    # last column of b with a[i - 1] so far
+        for j in range(first, min(len(b), i + maxDistance) + 1):
+            i1 = last.get(b[j - 1], 0)
+            j1 = lastColumn
+            if a[i - 1] == b[j - 1]:
+                cost = 0
+                lastColumn = j
+            else:
+                cost = 1
+            row[j + 1] = min(previous[j] + cost, row[j] + 1, previous[j + 1] + 1,
+                             rows[i1][j1] + (i - i1 - 1) + 1 + (j - j1 - 1))
+        rows.append(row)
+        last[a[i - 1]] = i
+        # The minimum of a row never decreases in the following rows
+        if min(row) > maxDistance:
+            return maxDistance + 1
+    return min(rows[-1][-1], maxDistance + 1)
+
+
 class Word(object):
     """Container for word-based methods."""
 
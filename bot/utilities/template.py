@@ -0,0 +1,89 @@
+"""Contains compiled response templates."""
+import logging
+import re
+
+# Placeholders look like <USER> or <u_pronoun0>, "<3" is no placeholder
+PLACEHOLDER = re.compile(r'(<[A-Za-z0-9_]+>)')
+
+
+class KeepMissing(dict):
+    """Arguments for str.format_map() which keep placeholders without a value as they are."""
+
+    def __missing__(self, key):
+        """Return the placeholder itself."""
+        return key
+
+
+class Template(object):
+    """A message with placeholders, compiled once so it can be rendered in a single pass."""
+
+    def __init__(self, text):
+        """Split text into literal parts and placeholders."""
+        self.text = text
+        # Literal parts are at even, placeholders at odd indices
+        parts = PLACEHOLDER.split(text)
+        self.placeholders = frozenset(parts[1::2])
+        # Rendered by str.format_map() in C: braces in literals are escaped, <USER> becomes {<USER>!s}
+        self.format = "".join(part.replace("{", "{{").replace("}", "}}") if i % 2 == 0 else "{" + part + "!s}"
+                              for i, part in enumerate(parts))
+
+    def render(self, args):
+        """Return the text with the placeholders replaced by str(args[placeholder]).
+
+        Placeholders without a value in args stay in the text as they are.
+        """
+        if not self.placeholders:
+            return self.text
+        try:
+            return self.format.format_map(args)
+        except KeyError:
+            return self.format.format_map(KeepMissing(args))
+
+
+# Maps text -> Template, so bots with the same responses share the compiled templates
+compiled = {}
+
+
+def getTemplate(text):
+    """Return the compiled Template of text."""
+    template = compiled.get(text)
+    if template is None:
+        template = compiled[text] = Template(text)
+    return template
+
+
+def compileResponses(responses, path=""):
+    """Return a dict text -> Template for all messages in responses.
+
+    Logs a warning for every placeholder a message uses which is not documented in its args_info,
+    and for every documented one it doesn't use, e.g. when a custom response dropped it.
+    Messages without any args_info are written as they are, so they are not checked.
+    """
+    templates = {}
+    if not isinstance(responses, dict):
+        return templates
+
+    if "msg" in responses:
+        msg = responses["msg"]
+        if isinstance(msg, dict):
+            texts = list(msg.values())
+        elif isinstance(msg, list):
+            texts = msg
+        else:
+            texts = [msg]
+        allowed = responses.get("args_info")
+
+        for text in texts:
+            if not isinstance(text, str):
+                continue
+            template = getTemplate(text)
+            templates[text] = template
+            if isinstance(allowed, dict) and allowed:
+                for placeholder in sorted(template.placeholders - set(allowed)):
+                    logging.warning("Unknown placeholder {} in response {}".format(placeholder, path or "/"))
+                for placeholder in sorted(set(allowed) - template.placeholders):
+                    logging.warning("Missing placeholder {} in response {}".format(placeholder, path or "/"))
+    else:
+        for key, value in responses.items():
+            templates.update(compileResponses(value, path + "/" + key))
+    return templates
@@ -1,4 +1,9 @@
 """Contains utility functions."""
+import json
+import os
+import tempfile
+import time
+from contextlib import contextmanager
 from datetime import datetime
 
 
@@ -12,6 +17,16 @@ def is_callID_active(callID):
         return False
 
 
+@contextmanager
+def timed(times, name):
+    """Add the seconds spent in the with block to times[name]."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        times[name] = times.get(name, 0) + time.perf_counter() - start
+
+
 def formatList(list):
     """Format a list to an enumeration.
 
@@ -64,3 +79,20 @@ def EmoteListToString(emoteList):
     # Use string.join to glue string of emotes in emoteList
     separator = " "
     return separator.join(emoteList)
+
+
+def dumpJSONAtomic(data, path, **kwargs):
+    """Write data as JSON to path, without ever leaving a half written file behind.
+
+    The JSON is written to a temporary file in the same folder first, which then replaces path.
+    Additional keyword arguments are passed on to json.dump().
+    """
+    folder = os.path.dirname(path) or "."
+    fd, tmpPath = tempfile.mkstemp(dir=folder, prefix=".tmp_", suffix=".json")
+    try:
+        with os.fdopen(fd, 'w', encoding="utf-8") as file:
+            json.dump(data, file, **kwargs)
+        os.replace(tmpPath, path)
+    except BaseException:
+        os.remove(tmpPath)
+        raise
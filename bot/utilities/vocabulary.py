@@ -0,0 +1,102 @@
+"""Contains the emote vocabulary shared by all bots, and compact sets of emotes."""
+import sys
+import threading
+
+
+class Vocabulary(object):
+    """Numbers every emote and emoji once per process.
+
+    Names are interned, so all bots and cache entries can share one copy of every name,
+    and sets of names can be stored as bitsets over their numbers.
+    """
+
+    def __init__(self):
+        """Initialize variables."""
+        self.ids = {}       # Maps name -> id
+        self.names = []     # Maps id -> name
+        self.sets = {}      # Maps key -> (list, EmoteSet), see setOf()
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        """Return the number of names."""
+        return len(self.names)
+
+    def intern(self, names):
+        """Return a list of the canonical copies of names, adding new ones to the vocabulary."""
+        with self.lock:
+            result = []
+            for name in names:
+                i = self.ids.get(name)
+                if i is None:
+                    name = sys.intern(name)
+                    i = self.ids[name] = len(self.names)
+                    self.names.append(name)
+                result.append(self.names[i])
+            return result
+
+    def emoteSet(self, names):
+        """Return an EmoteSet of names."""
+        self.intern(names)
+        ids = [self.ids[name] for name in names]
+        bits = bytearray(max(ids) // 8 + 1 if ids else 0)
+        for i in ids:
+            bits[i >> 3] |= 1 << (i & 7)
+        return EmoteSet(self, bytes(bits))
+
+    def setOf(self, key, names):
+        """Return the EmoteSet of a list stored under key, e.g. the url it was loaded from.
+
+        The set is built only once per list, so bots sharing a list of the web cache share its
+        set. The list is changed to contain the canonical copies of the names, so the copies
+        parsed from the json can be freed.
+        """
+        with self.lock:
+            cached = self.sets.get(key)
+        if cached is None or cached[0] is not names:
+            names[:] = self.intern(names)
+            cached = (names, self.emoteSet(names))
+            with self.lock:
+                self.sets[key] = cached
+        return cached[1]
+
+
+class EmoteSet(object):
+    """Read-only set of emotes, stored as a bitset over the ids of a Vocabulary.
+
+    Bit i is stored in byte i // 8, so membership needs no big integer arithmetic.
+    """
+
+    __slots__ = ('vocabulary', 'bits', 'size')
+
+    def __init__(self, vocabulary, bits):
+        """Store the bits, little endian bytes."""
+        self.vocabulary = vocabulary
+        self.bits = bits
+        self.size = sum(bin(byte).count('1') for byte in bits)
+
+    def __contains__(self, name):
+        """Return whether name is in the set."""
+        i = self.vocabulary.ids.get(name)
+        return i is not None and i >> 3 < len(self.bits) and self.bits[i >> 3] >> (i & 7) & 1 == 1
+
+    def __len__(self):
+        """Return the number of names in the set."""
+        return self.size
+
+    def __iter__(self):
+        """Iterate over the names, in the order they were added to the vocabulary."""
+        names = self.vocabulary.names
+        for byte, value in enumerate(self.bits):
+            while value:
+                low = value & -value
+                yield names[byte * 8 + low.bit_length() - 1]
+                value ^= low
+
+    def __or__(self, other):
+        """Return the union of two sets of the same vocabulary."""
+        bits = int.from_bytes(self.bits, 'little') | int.from_bytes(other.bits, 'little')
+        return EmoteSet(self.vocabulary, bits.to_bytes(max(len(self.bits), len(other.bits)), 'little'))
+
+
+# Shared by every bot of the process
+vocabulary = Vocabulary()
@@ -1,73 +1,278 @@
 """Module that caches web requests."""
 
-import requests
 from requests import RequestException
 import logging
-from datetime import datetime
+import random
+import threading
+import traceback
+from datetime import datetime, timedelta
+
+from twisted.internet import reactor
+
+from bot.utilities.diskcache import disk as sharedDisk
+from bot.utilities.httpclient import client
 
 DEFAULT_DURATION = 21600  # 6 hrs in sec
+DEFAULT_JITTER = 0.1      # entries expire up to 10% earlier, so urls loaded together don't expire together
+RETRY_DELAY = 60          # seconds until a failed refresh is tried again, the stale data is served meanwhile
+
+NOT_MODIFIED = object()   # Returned by load() if the server confirmed the stored data with a 304
 
 
 class WebCache():
-    """Caches web requests."""
+    """Caches web requests.
 
-    def __init__(self, duration=DEFAULT_DURATION):
-        """Initialize variables."""
-        self.data = dict()  # Maps url -> [data, timestamp]
+    Expired entries are served stale while a single background refresh per url reloads them,
+    only urls without any data block the caller. Loaded data is also written to a DiskCache,
+    which fills the memory after a restart. Refreshes of such data are conditional requests.
+    """
+
+    def __init__(self, duration=DEFAULT_DURATION, jitter=DEFAULT_JITTER, disk=sharedDisk):
+        """Initialize variables. Use disk=None for a cache that only lives in memory."""
+        self.data = dict()  # Maps url -> [data, timestamp, expiry, validators]
         self.duration = duration
+        self.durations = dict()     # Maps url -> duration, for urls which don't use the default one
+        self.jitter = jitter
+        self.disk = disk
+        self.version = 0    # Increased every time an entry is stored
+        self.versions = dict()      # Maps url -> number of times it was stored or invalidated
+
+        self.lock = threading.Lock()
+        self.loading = dict()       # Maps url -> lock held while the url is loaded
+        self.refreshing = set()     # Urls with a background refresh in flight
+        self.stats = {"hits": 0, "misses": 0, "stale": 0, "disk": 0, "refreshes": 0, "notModified": 0, "errors": 0}
 
-    def get(self, url, function=None, fallback=None):
+    def get(self, url, function=None, fallback=None, duration=None):
         """Get the json returned by an url.
 
         If a 'function' is defined, the result of 'function(json)' gets returned.
+        If a 'duration' is defined, it is used for this url instead of the default duration.
         """
-        if self.isExpired(url):
-            timestamp = datetime.now()
-            json = self.loadJSON(url)
-            if json:
-                if function is not None:
-                    result = function(json)
-                else:
-                    result = json
-                self.data[url] = [result, timestamp]
-                return result
+        if duration is not None:
+            self.durations[url] = duration
+
+        entry = self.data.get(url)
+        if entry is not None:
+            if datetime.now() < entry[2]:
+                self.stats["hits"] += 1
             else:
-                # fallback if url down or json cannot be loaded
+                self.stats["stale"] += 1
+                self.refresh(url, function)
+            return entry[0]
+
+        # Nothing to serve, load it now. Other threads missing the same url wait for this load.
+        with self.lock:
+            urlLock = self.loading.setdefault(url, threading.Lock())
+        try:
+            with urlLock:
                 if url in self.data:
+                    self.stats["hits"] += 1
                     return self.data[url][0]
+
+                # Data from an earlier run is served like any other entry, stale or not
+                stored = self.disk.get(url) if self.disk is not None else None
+                if stored is not None:
+                    self.stats["disk"] += 1
+                    data, timestamp, validators = stored
+                    self.store(url, data, timestamp, validators, persist=False)
+                    if self.isExpired(url):
+                        self.refresh(url, function)
+                    return data
+
+                self.stats["misses"] += 1
+                timestamp = datetime.now()
+                result, validators = self.load(url, function)
+                if result is not None:
+                    self.store(url, result, timestamp, validators)
+                    return result
                 else:
+                    # fallback if url down or json cannot be loaded
                     if fallback is not None:
-                        self.data[url] = [fallback, timestamp]
+                        self.store(url, fallback, timestamp, persist=False)
                         return fallback
                     else:
                         raise RequestException
-        else:
-            return self.data[url][0]
+        finally:
+            # Once loaded the url is served from self.data, its lock isn't needed anymore
+            with self.lock:
+                if self.loading.get(url) is urlLock:
+                    del self.loading[url]
+
+    def refresh(self, url, function=None):
+        """Reload the data of url in the background, unless that is already happening."""
+        with self.lock:
+            if url in self.refreshing:
+                return
+            self.refreshing.add(url)
+        reactor.callInThread(self.__refresh, url, function)
+
+    def __refresh(self, url, function):
+        """Reload the data of url and store it, keep the stale data if that fails."""
+        try:
+            self.stats["refreshes"] += 1
+            timestamp = datetime.now()
+            entry = self.data.get(url)
+            try:
+                result, validators = self.load(url, function, entry[3] if entry is not None else None)
+                if result is NOT_MODIFIED:
+                    self.stats["notModified"] += 1
+                    self.store(url, entry[0], timestamp, validators, persist=False)
+                    if self.disk is not None:
+                        self.disk.touch(url, timestamp, validators)
+                    return
+                elif result is not None:
+                    self.store(url, result, timestamp, validators)
+                    return
+            except Exception:
+                # E.g. function can't handle a changed api, keep the stale data like for failed downloads
+                self.stats["errors"] += 1
+                logging.critical("Cannot refresh url: {}".format(url))
+                logging.error(traceback.format_exc())
+
+            with self.lock:
+                if url in self.data:
+                    self.data[url][2] = datetime.now() + timedelta(seconds=RETRY_DELAY)
+        finally:
+            with self.lock:
+                self.refreshing.discard(url)
+
+    def load(self, url, function=None, validators=None):
+        """Load the json of url and apply function to it.
+
+        Return (result, validators). The result is NOT_MODIFIED if validators were given
+        and the server confirmed them, None if something fails.
+        """
+        json, validators = self.loadJSON(url, validators)
+        if json is NOT_MODIFIED:
+            return NOT_MODIFIED, validators
+        if not json:
+            self.stats["errors"] += 1
+            return None, None
+        if function is not None:
+            return function(json), validators
+        return json, validators
+
+    def store(self, url, data, timestamp, validators=None, persist=True):
+        """Store data for url, with an expiry time randomized by the jitter."""
+        duration = self.durations.get(url, self.duration)
+        expiry = timestamp + timedelta(seconds=duration * (1 - random.uniform(0, self.jitter)))
+        with self.lock:
+            self.data[url] = [data, timestamp, expiry, validators]
+            self.version += 1
+            self.versions[url] = self.versions.get(url, 0) + 1
+        if persist and self.disk is not None:
+            self.disk.store(url, data, timestamp, validators)
+
+    def invalidate(self, url):
+        """Drop the data of url from memory and disk, the next get() downloads it again."""
+        with self.lock:
+            if self.data.pop(url, None) is not None:
+                self.version += 1
+                self.versions[url] = self.versions.get(url, 0) + 1
+        if self.disk is not None:
+            self.disk.remove(url)
+
+    def namespace(self, name, duration=None):
+        """Return a CacheNamespace of this cache for one bot."""
+        return CacheNamespace(self, name, duration)
 
     def isExpired(self, url):
         """Return whether recent data exists for the given url."""
         if url in self.data:
-            return (datetime.now() - self.data[url][1]).seconds > self.duration
+            return datetime.now() >= self.data[url][2]
         else:
             return True
 
-    def loadJSON(self, url):
-        """Load a JSON from an url, return False if something fails."""
+    def expiresAt(self, url):
+        """Return the datetime at which the data of the given url expires."""
+        if url in self.data:
+            return self.data[url][2]
+        else:
+            return datetime.now()
+
+    def getStats(self):
+        """Return a copy of the hit/miss/refresh counters."""
+        return dict(self.stats)
+
+    def loadJSON(self, url, validators=None):
+        """Load a JSON from an url, return (json, validators).
+
+        The json is False if something fails and NOT_MODIFIED if the validators are still valid.
+        """
+        headers = {}
+        if validators:
+            if validators.get("etag"):
+                headers["If-None-Match"] = validators["etag"]
+            if validators.get("last_modified"):
+                headers["If-Modified-Since"] = validators["last_modified"]
+
         try:
-            r = requests.get(url)
+            r = client.get(url, headers=headers or None)
+            if r.status_code == 304 and headers:
+                return NOT_MODIFIED, validators
             r.raise_for_status()
-            return r.json()
+            validators = {"etag": r.headers.get("ETag"), "last_modified": r.headers.get("Last-Modified")}
+            return r.json(), validators
 
         except RequestException as e:
             # Fail to get JSON from URL
             logging.critical("Cannot load url: {}".format(url))
             logging.warning(e)
 
-            return False
+            return False, None
 
         except ValueError as e:
             # Server returned something that can't be parsed as json
             logging.critical("Url ({}), failed to parse JSON.".format(url))
             logging.warning(e)
 
-            return False
+            return False, None
+
+
+class CacheNamespace(object):
+    """The part of a shared WebCache used by one bot.
+
+    Urls are stored only once in the shared cache, so global emotes, cards and emojis are
+    downloaded and parsed once per process. The namespace remembers which urls its bot uses,
+    so its version only changes with those urls and clear() only drops those urls.
+    """
+
+    def __init__(self, cache, name, duration=None):
+        """Initialize variables."""
+        self.cache = cache
+        self.name = name
+        self.duration = duration
+        self.urls = set()
+
+    def get(self, url, function=None, fallback=None, duration=None):
+        """Get the json returned by an url, like WebCache.get()."""
+        self.urls.add(url)
+        return self.cache.get(url, function, fallback, duration or self.duration)
+
+    @property
+    def version(self):
+        """Changes whenever one of the urls of this namespace is stored or invalidated."""
+        versions = self.cache.versions
+        return sum(versions.get(url, 0) for url in self.urls)
+
+    def clear(self):
+        """Drop the data of all urls used in this namespace, they are downloaded again on next use."""
+        logging.info("Clearing web cache of {}, stats: {}".format(self.name, self.cache.getStats()))
+        for url in list(self.urls):
+            self.cache.invalidate(url)
+
+    def isExpired(self, url):
+        """Return whether recent data exists for the given url."""
+        return self.cache.isExpired(url)
+
+    def expiresAt(self, url):
+        """Return the datetime at which the data of the given url expires."""
+        return self.cache.expiresAt(url)
+
+    def getStats(self):
+        """Return the counters of the shared cache."""
+        return self.cache.getStats()
+
+
+# Shared by every bot of the process, bots use their own namespace of it
+shared = WebCache()
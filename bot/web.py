@@ -2,15 +2,17 @@
 import json
 import logging
 import os
-import requests
 import threading
 import urllib.parse
 
 from bottle import ServerAdapter, abort, request, route, run
 from jwcrypto import jwk, jws, jwt
+from requests import RequestException
+from twisted.internet import reactor, threads
 
-from bot.paths import CONFIG_PATH
-from bot.paths import OIDC_API, USER_ID_API
+from bot.emotecounter import TOP_CAPACITY
+from bot.paths import CONFIG_PATH, OIDC_API, STATISTIC_FILE, USER_ID_API
+from bot.utilities.httpclient import client
 
 # Regarding decoding:
 # https://bottlepy.org/docs/dev/tutorial.html#introducing-formsdict
@@ -217,8 +219,17 @@ class WebAPI(object):
         if path is None:
             abort(404, "File \"" + filename + "\" not found.")
 
-        with open(path, mode='w') as file:
-            json.dump(json_data, file, indent=4)
+        isStatistic = path == STATISTIC_FILE.format(bot.root)
+        if isStatistic and not WebAPI.isEmoteCount(json_data):
+            abort(400, "The emote statistic has to be a json dictionary of emote -> count.")
+
+        if isStatistic:
+            # Emote statistics are kept in memory and written by the reactor thread, which counts
+            # emotes. Swap and write them there, so a flush of the old counts can't overwrite the file.
+            threads.blockingCallFromThread(reactor, bot.ecount.setTotalCount, json_data)
+        else:
+            with open(path, mode='w') as file:
+                json.dump(json_data, file, indent=4)
 
         bot.reloadConfig()
 
@@ -258,6 +269,35 @@ class WebAPI(object):
         else:
             abort(400, "pause must be either 'True' or 'False'")
 
+    @route('/emotes/top/<botname>')
+    def getTopEmotes(botname):
+        """Return the most used emotes of a bot, e.g. for stream overlays.
+
+        Query parameters: k, the number of emotes (at most TOP_CAPACITY), and window, one of
+        the windows of the emote counter in seconds or 'all'.
+        """
+        bot = WebAPI.getBot(botname)
+        window = request.query.get('window', '60')
+        try:
+            k = min(int(request.query.get('k', '5')), TOP_CAPACITY)
+            window = None if window == 'all' else int(window)
+        except ValueError:
+            abort(400, "k and window must be numbers.")
+        if window is not None and window not in bot.ecount.windows:
+            abort(400, "window must be 'all' or one of " + str(list(bot.ecount.windows)))
+
+        # The counter is changed by the reactor thread with every message
+        if window is None:
+            top = threads.blockingCallFromThread(reactor, bot.ecount.getTopTotalEmotes, k)
+        else:
+            top = threads.blockingCallFromThread(reactor, bot.ecount.getTopEmotes, k, window)
+        return json.dumps({"window": window or 'all', "emotes": [{"emote": e, "count": c} for e, c in top]})
+
+    def isEmoteCount(data):
+        """Return whether data is a dict of emote -> count."""
+        return isinstance(data, dict) and all(
+            isinstance(emote, str) and type(count) is int for emote, count in data.items())
+
     def checkIfFormExists(keys):
         """Get all forms for the given keys."""
         for k in keys:
@@ -301,7 +341,10 @@ class WebAPI(object):
 
     def getUserNameAndVerifyToken(auth):
         """Verify id_token and returns the username."""
-        r = requests.get(OIDC_API)
+        try:
+            r = client.get(OIDC_API)
+        except RequestException:
+            abort(503, "Cannot reach twitch api.")
         if r.status_code != 200:
             abort(503, "Cannot reach twitch api.")
 
@@ -322,7 +365,10 @@ class WebAPI(object):
 
         # Get username for id
         headers = {'Client-id': clientID, 'Accept': 'application/vnd.twitchtv.v5+json'}
-        r = requests.get(USER_ID_API.format(user_id), headers=headers)
+        try:
+            r = client.get(USER_ID_API.format(user_id), headers=headers)
+        except RequestException:
+            abort(503, "Cannot reach twitch api.")
         if r.status_code != 200:
             abort(503, "Cannot reach twitch api.")
 
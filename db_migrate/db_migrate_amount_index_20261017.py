@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+import sqlite3
+import os
+
+# Adds an index on points.amount, so rank lookups (COUNT of higher amounts) and
+# !topspammers (ORDER BY amount DESC LIMIT n) don't need to scan the whole table.
+# The bot creates the index itself on start as well, running this beforehand just
+# keeps the first start of big channels quick.
+
+# SQL to check the result -- won't be used in this program
+SQL_FOR_CHECKING_RESULT = r"""
+    EXPLAIN QUERY PLAN SELECT COUNT(*) FROM points WHERE amount > 100
+"""
+
+
+def db_add_index(db_path):
+    sql_index_command = r"""
+        CREATE INDEX IF NOT EXISTS points_amount ON points (amount);
+        ANALYZE;
+    """
+
+    try:
+        with sqlite3.connect(db_path) as connection:
+            connection.executescript(sql_index_command)
+            print("Index on amount added for {}".format(db_path))
+    except sqlite3.Error as e:
+        print("DB error when adding index in {}".format(db_path))
+        print(e.args[0])
+        raise e
+
+
+def start_db_migrate():
+    CHANNELS_DIR = "../channels"
+    PATH_TO_DB = "data/monkalot.db"
+    FULL_PATH = CHANNELS_DIR + "/{}/" + PATH_TO_DB
+
+    bot_instances_dir = os.listdir(CHANNELS_DIR)
+
+    # ignore template folder from our list
+    "template" in bot_instances_dir and bot_instances_dir.remove("template")
+
+    for inst in bot_instances_dir:
+        db_path = FULL_PATH.format(inst)
+
+        if os.path.isfile(db_path):
+            db_add_index(db_path)
+
+
+if __name__ == "__main__":
+    start_db_migrate()
+    print("End of db migrate")
@@ -6,41 +6,61 @@ import logging.config
 import os
 import signal
 import time
+import traceback
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 
-from twisted.internet import protocol, reactor
+from twisted.internet import reactor
 
-from bot.bot import TwitchBot
-from bot.multibot_irc_client import MultiBotIRCClient
+from bot.bot import TwitchBot, prefetchGlobalData
+from bot.ircmanager import CHANNELS_PER_CONNECTION, DEFAULT_HOST, DEFAULT_PORT, IRCConnectionManager
 from bot.web import WebAPI
 
 logging.config.fileConfig('config/logging.conf')
 
+STARTUP_WORKERS = 8     # bots constructed at the same time
+PROFILED_COMMANDS = 10  # slowest commands shown in the startup report
 
-class BotFactory(protocol.ClientFactory):
-    """BotFactory for connecting to a protocol."""
 
-    protocol = MultiBotIRCClient
+def createBots(paths, workers):
+    """Construct a bot for every path, up to workers at the same time, and log how long it took.
 
-    tags = defaultdict(dict)
-    activity = dict()
-    wait_time = 1
+    Bots are returned in the order of paths. The data all bots share is loaded first.
+    """
+    start = time.perf_counter()
 
-    def clientConnectionLost(self, connector, reason):
-        """Log and reload bot."""
-        logging.error("Lost connection")
+    # Created here, so the bots don't race to create it from the worker threads
+    reactor.getThreadPool()
 
-        self.protocol = MultiBotIRCClient
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for future in prefetchGlobalData(pool):
+            future.result()
+        prefetched = time.perf_counter()
+        bots = list(pool.map(TwitchBot, paths))
 
-        connector.connect()
+    end = time.perf_counter()
+    logging.warning("Started {} bots in {:.2f}s, {:.2f}s of it loading shared data".format(
+        len(bots), end - start, prefetched - start))
 
-    def clientConnectionFailed(self, connector, reason):
-        """Log, sleep some time and try to reconnect."""
-        msg = "Could not connect, retrying in {}s"
-        logging.warning(msg.format(self.wait_time))
-        time.sleep(self.wait_time)
-        self.wait_time = min(512, self.wait_time * 2)
-        connector.connect()
+    phases = defaultdict(float)
+    for b in bots:
+        times = b.startupTimes
+        for phase, seconds in times.items():
+            phases[phase] += seconds
+        logging.info("Startup of {}: {:.2f}s ({})".format(b.root, sum(times.values()), ", ".join(
+            "{} {:.2f}s".format(phase, seconds) for phase, seconds in times.items())))
+    logging.warning("Time per phase, summed over all bots: " + ", ".join(
+        "{} {:.2f}s".format(phase, seconds) for phase, seconds in phases.items()))
+
+    commands = defaultdict(lambda: [0, 0])
+    for b in bots:
+        for name, (seconds, memory) in b.commandProfile.items():
+            commands[name][0] += seconds
+            commands[name][1] += memory or 0
+    slowest = sorted(commands.items(), key=lambda item: item[1][0], reverse=True)[:PROFILED_COMMANDS]
+    logging.warning("Slowest commands to initialize, summed over all bots: " + ", ".join(
+        "{} {:.3f}s {:.1f}KiB".format(name, seconds, memory / 1024) for name, (seconds, memory) in slowest))
+    return bots
 
 
 def stop(signal, frame):
@@ -48,7 +68,16 @@ def stop(signal, frame):
     if port is not None:
         logging.warning("Stopping web server")
         web.stop()
-    logging.warning("Stopping irc client")
+    logging.warning("Stopping bots")
+    for b in bots:
+        # Bots write their pending points and statistics here, one failing bot must not stop the others
+        try:
+            b.terminate()
+        except Exception:
+            logging.error(traceback.format_exc())
+    for account, stats in connections.getStats().items():
+        logging.warning("Outbound messages of {}: {}".format(account, stats))
+    logging.warning("Stopping irc clients")
     reactor.stop()
 
 
@@ -58,21 +87,27 @@ if __name__ == "__main__":
     parser.add_argument("-p", help="Port for the api webserver. If no port is given, no webserver is started.")
     parser.add_argument("-c", help="Folder containing the channel data and configs.", default="channels")
     parser.add_argument("-s", help="Secret password for using the api without having to login to twitch.")
+    parser.add_argument("-w", type=int, default=STARTUP_WORKERS, help="Number of bots started at the same time.")
+    parser.add_argument("-n", type=int, default=CHANNELS_PER_CONNECTION, help="Maximum number of channels per IRC connection.")
+    parser.add_argument("-i", default="{}:{}".format(DEFAULT_HOST, DEFAULT_PORT),
+                        help="IRC server as host:port, e.g. a local test server like tools/fake_irc_server.py.")
     args = parser.parse_args()
     port = args.p
     config_folder = args.c
     password = args.s
 
     # Read config folder for different bot configurations
-    bots = []
+    paths = []
     for f in os.listdir(config_folder):
         path = config_folder + "/" + f + "/"
         if f != 'template' and os.path.isdir(path):
             logging.warning("Adding folder: " + path)
-            bots.append(TwitchBot(path))
+            paths.append(path)
+    bots = createBots(paths, args.w)
 
-    # Statically set the bots used by the MultiBotIRCClient
-    MultiBotIRCClient.bots = bots
+    # Distribute the channels over IRC connections
+    host, _, ircPort = args.i.rpartition(":")
+    connections = IRCConnectionManager(bots, host, int(ircPort), args.n)
 
     if port is not None:
         # Start the Web API
@@ -81,6 +116,6 @@ if __name__ == "__main__":
     # On interrupt shut down the reactor and webserver
     signal.signal(signal.SIGINT, stop)
 
-    # Start the client
-    reactor.connectTCP('irc.twitch.tv', 6667, BotFactory())
+    # Start the clients
+    connections.connect()
     reactor.run()
@@ -0,0 +1,123 @@
+"""Benchmark: linear match() scan vs. CommandDispatcher over a recorded chat log.
+
+Run from the repository root, e.g.:
+    python tools/bench_dispatch.py channels/mychannel/ logs/bot.log
+    python tools/bench_dispatch.py --offline channels/template/ logs/bot.log
+
+The log can be the bot's own log (lines like '[#channel] user: message') or a plain text
+file with one chat message per line. The bot is built like in monkalot.py, so the channel
+config has to be valid. Nothing is written to chat. With --offline the api data comes from the
+sample payloads of mem_report_cache.py and every user id is 0, so no network is needed.
+"""
+import argparse
+import os
+import re
+import sys
+import time
+
+from requests import RequestException
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from mem_report_cache import GLOBAL_URLS, offlineCache, samplePayload, syntheticPayload  # noqa: E402
+
+from bot.bot import TwitchBot  # noqa: E402
+from bot.commands import CommandDispatcher  # noqa: E402
+from bot.paths import CHANNEL_BTTVEMOTES_API  # noqa: E402
+from bot.utilities.httpclient import client  # noqa: E402
+from bot.utilities.webcache import shared as sharedCache  # noqa: E402
+
+LOG_LINE = re.compile(r'\[#[^\]]+\] ([^:\s]+): (.*)$')
+
+TAG_INFO = {
+    'display_name': None,
+    'user_id': '0',
+    'is_mod': False,
+    'is_sub': False,
+    'is_broadcaster': False,
+    'twitch_emote_only': False,
+    'twitch_emotes': {}
+}
+
+
+def useOfflineData():
+    """Serve the shared web cache from sample payloads and don't look up user ids."""
+    payloads = {url: samplePayload(url) for url in GLOBAL_URLS}
+    payloads["channel"] = syntheticPayload(CHANNEL_BTTVEMOTES_API)
+    offlineCache(payloads, sharedCache)
+    sharedCache.disk = None
+    TwitchBot.getuserID = lambda self, username: "0"
+
+    def getJSON(url, headers=None, timeout=None):
+        # Only the chatter list is requested while the bot starts
+        if "chatters" in url:
+            return {"chatters": {}}
+        raise RequestException("offline: " + url)
+    client.getJSON = getJSON
+
+
+def readLog(path):
+    """Return a list of (user, message) tuples from a chat log."""
+    lines = []
+    with open(path, encoding="utf-8") as file:
+        for line in file:
+            line = line.rstrip('\n')
+            m = LOG_LINE.search(line)
+            if m:
+                lines.append((m.group(1).lower(), m.group(2).strip()))
+            elif line.strip():
+                lines.append(("viewer", line.strip()))
+    return lines
+
+
+def linear(bot, commands, lines):
+    """Call match() of every command for every line."""
+    matches = 0
+    for user, msg in lines:
+        for cmd in commands:
+            if cmd.match(bot, user, msg, TAG_INFO):
+                matches += 1
+        bot.antispeech = False
+    return matches
+
+
+def dispatched(bot, dispatcher, lines):
+    """Call match() only for the candidates returned by the dispatcher."""
+    matches = 0
+    for user, msg in lines:
+        for cmd in dispatcher.candidates(msg):
+            if cmd.match(bot, user, msg, TAG_INFO):
+                matches += 1
+        bot.antispeech = False
+    return matches
+
+
+def measure(name, function, *args):
+    """Run function and print lines/sec."""
+    lines = args[-1]
+    start = time.perf_counter()
+    matches = function(*args)
+    elapsed = time.perf_counter() - start
+    print("{:<12} {:>12.0f} lines/sec  ({} matches)".format(name, len(lines) / elapsed, matches))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark command dispatching.")
+    parser.add_argument("channel", help="Channel folder, e.g. channels/mychannel/")
+    parser.add_argument("log", help="Recorded chat log")
+    parser.add_argument("-r", type=int, default=5, help="Repetitions of the log")
+    parser.add_argument("--offline", action="store_true", help="Use sample api data instead of the network")
+    args = parser.parse_args()
+
+    if args.offline:
+        useOfflineData()
+
+    bot = TwitchBot(args.channel)
+    bot.write = lambda msg: None
+    bot.irc = None
+
+    lines = readLog(args.log) * args.r
+    print("{} lines, {} commands".format(len(lines), len(bot.commands)))
+
+    measure("linear", linear, bot, bot.commands, lines)
+    measure("dispatcher", dispatched, bot, CommandDispatcher(bot.commands), lines)
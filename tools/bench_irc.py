@@ -0,0 +1,128 @@
+"""Benchmark: old two-pass IRC line handling vs. the single pass parseLine().
+
+Run from the repository root, e.g.:
+    python tools/bench_irc.py                   # a generated log of a million lines
+    python tools/bench_irc.py raw_irc.log -n 0  # a recorded log, one raw IRC line per line
+
+Only the parsing is measured, no bot is involved. The old way decodes the line, splits
+and unescapes all tags, strips the tags and lets twisted parse the rest a second time.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from twisted.words.protocols import irc  # noqa: E402
+
+from bot.utilities.ircparser import parseLine  # noqa: E402
+
+PRIVMSG = ("@badge-info=;badges=subscriber/12,premium/1;color=#1E90FF;display-name=Viewer{0};emotes={1};"
+           "flags=;id=3c2b1a0f-8d9e-4f5a-b6c7-{0:012d};mod=0;room-id=12345;subscriber=1;tmi-sent-ts=1510000000000;"
+           "turbo=0;user-id={0};user-type= :viewer{0}!viewer{0}@viewer{0}.tmi.twitch.tv PRIVMSG #channel :{2}")
+USERNOTICE = ("@badges=subscriber/0;color=;display-name=Viewer{0};emotes=;id=abc;login=viewer{0};mod=0;"
+              "msg-id=resub;msg-param-months=6;msg-param-sub-plan=Prime;msg-param-sub-plan-name=Channel\\sSubscription;"
+              "room-id=12345;subscriber=1;system-msg=viewer{0}\\shas\\ssubscribed\\sfor\\s6\\smonths!;"
+              "tmi-sent-ts=1510000000000;turbo=0;user-id={0};user-type= :tmi.twitch.tv USERNOTICE #channel :{2}")
+OTHER = [":viewer{0}!viewer{0}@viewer{0}.tmi.twitch.tv JOIN #channel",
+         ":viewer{0}!viewer{0}@viewer{0}.tmi.twitch.tv PART #channel",
+         "PING :tmi.twitch.tv"]
+MESSAGES = ["Kappa", "LUL LUL LUL", "!rank", "PogChamp Kappa this is a normal chat message", "monkaS",
+            "what is the song called?", "[Ragnaros the Firelord]", "4Head 4Head"]
+
+
+def generate(n):
+    """Return n raw lines, mostly chat messages, like a busy channel."""
+    random.seed(1)
+    lines = []
+    for i in range(n):
+        r = random.random()
+        msg = random.choice(MESSAGES)
+        if r < 0.9:
+            emotes = "25:0-4" if msg.startswith("Kappa") else ""
+            line = PRIVMSG.format(i % 5000, emotes, msg)
+        elif r < 0.91:
+            line = USERNOTICE.format(i % 5000, "", msg)
+        else:
+            line = random.choice(OTHER).format(i % 5000)
+        lines.append(line.encode("utf-8"))
+    return lines
+
+
+def readLog(path):
+    """Return the raw lines of a recorded log."""
+    with open(path, "rb") as file:
+        return [line.rstrip(b"\r\n") for line in file if line.strip()]
+
+
+def oldUnescapeTags(tags):
+    """The tag unescaping as MultiBotIRCClient did it before."""
+    for k, v in tags.items():
+        content = v
+        content = content.replace("\\:", ";")
+        content = content.replace("\\s:", " ")
+        content = content.replace("\\\\", "\\")
+        content = content.replace("\\r", "\r")
+        content = content.replace("\\n", "\n")
+        tags[k] = content
+    return tags
+
+
+def oldParsemsg(s):
+    """The line parsing as MultiBotIRCClient did it before."""
+    tags = {}
+    prefix = ''
+    if s[0] == '@':
+        tags_str, s = s[1:].split(' ', 1)
+        tags = oldUnescapeTags(dict(t.split('=') for t in tags_str.split(';')))
+    if s[0] == ':':
+        prefix, s = s[1:].split(' ', 1)
+    if s.find(' :') != -1:
+        s, trailing = s.split(' :', 1)
+        args = s.split()
+        args.append(trailing)
+    else:
+        args = s.split()
+    command = args.pop(0).lower()
+    return tags, prefix, command, args
+
+
+def old(lines):
+    """Parse like before: own parse, then a second parse by twisted for every line."""
+    for line in lines:
+        line = line.decode("utf-8")
+        oldParsemsg(line)
+        if line[0] == "@":
+            line = line.split(' ', 1)[1]
+        irc.parsemsg(irc.lowDequote(line))
+
+
+def new(lines):
+    """Parse every line once."""
+    for line in lines:
+        parseLine(line)
+
+
+def measure(name, function, lines):
+    """Run function and print lines/sec."""
+    start = time.perf_counter()
+    function(lines)
+    elapsed = time.perf_counter() - start
+    print("{:<6} {:>12.0f} lines/sec  ({:.2f}s)".format(name, len(lines) / elapsed, elapsed))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark IRC line parsing.")
+    parser.add_argument("log", nargs="?", help="Recorded raw IRC log, generated if not given")
+    parser.add_argument("-n", type=int, default=1000000, help="Lines to generate, or to use of the log (0: all)")
+    args = parser.parse_args()
+
+    lines = readLog(args.log) if args.log else generate(args.n)
+    if args.log and args.n:
+        lines = lines[:args.n]
+    print("{} lines".format(len(lines)))
+
+    measure("old", old, lines)
+    measure("new", new, lines)
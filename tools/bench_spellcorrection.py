@@ -0,0 +1,105 @@
+"""Benchmark: SpellCorrection vs. SymSpellCorrection on card names.
+
+Run from the repository root, e.g.:
+    python tools/bench_spellcorrection.py                        # generated card names
+    python tools/bench_spellcorrection.py cards.collectible.json  # real cards from hearthstonejson.com
+
+Both engines correct the same misspelled names. The results are compared, and the
+candidates of SymSpellCorrection are checked against a brute force search of all words.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from bot.utilities.spellcorrection import SpellCorrection, SymSpellCorrection, distance  # noqa: E402
+
+SYLLABLES = ["ra", "gna", "ros", "fire", "lord", "mal", "ga", "nis", "dr", "ake", "tho", "ryx", "leer",
+             "oy", "yo", "gg", "saron", "bru", "tal", "zul", "jin", "kel", "thu", "zad", "mur", "loc"]
+LETTERS = "abcdefghijklmnopqrstuvwxyz"
+
+
+def generateNames(n):
+    """Return n card names like 'thoryx the malganis'."""
+    names = set()
+    while len(names) < n:
+        words = ["".join(random.choice(SYLLABLES) for _ in range(random.randint(1, 3)))
+                 for _ in range(random.randint(1, 3))]
+        if len(words) == 3:
+            words[1] = random.choice(["the", "of", "'s"])
+        names.add(" ".join(words).replace(" 's", "'s"))
+    return names
+
+
+def misspell(name, typos):
+    """Return name with typos random deletes, inserts, replaces or transposes."""
+    for _ in range(typos):
+        i = random.randrange(len(name))
+        kind = random.randrange(4)
+        if kind == 0 and len(name) > 1:
+            name = name[:i] + name[i + 1:]
+        elif kind == 1:
+            name = name[:i] + random.choice(LETTERS) + name[i:]
+        elif kind == 2:
+            name = name[:i] + random.choice(LETTERS) + name[i + 1:]
+        elif i < len(name) - 1:
+            name = name[:i] + name[i + 1] + name[i] + name[i + 2:]
+    return name
+
+
+def timeit(function, queries):
+    """Return the results of function for all queries and the seconds per query."""
+    start = time.perf_counter()
+    results = [function(q) for q in queries]
+    return results, (time.perf_counter() - start) / len(queries)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("cards", nargs="?", help="JSON file of Hearthstone cards, otherwise names are generated.")
+    parser.add_argument("-n", type=int, default=200, help="Number of misspelled names.")
+    parser.add_argument("--names", type=int, default=2000, help="Number of generated names.")
+    args = parser.parse_args()
+
+    random.seed(1)
+    if args.cards:
+        with open(args.cards, encoding="utf-8") as file:
+            words = {card["name"].lower() for card in json.load(file)}
+    else:
+        words = generateNames(args.names)
+    queries = [misspell(random.choice(sorted(words)), random.randint(0, 2)) for _ in range(args.n)]
+    print("{} names, {} queries, average length {:.1f}".format(len(words), len(queries),
+                                                                sum(map(len, queries)) / len(queries)))
+
+    start = time.perf_counter()
+    old = SpellCorrection(words)
+    oldBuild = time.perf_counter() - start
+    start = time.perf_counter()
+    new = SymSpellCorrection(words)
+    newBuild = time.perf_counter() - start
+    print("build:  old {:8.1f} ms, new {:8.1f} ms ({} index entries)".format(
+        oldBuild * 1000, newBuild * 1000, len(new.index)))
+
+    oldResults, oldTime = timeit(old.spell, queries)
+    newResults, newTime = timeit(new.spell, queries)
+    print("lookup: old {:8.1f} us, new {:8.1f} us, {:.0f}x faster".format(
+        oldTime * 1e6, newTime * 1e6, oldTime / newTime))
+
+    # Both have to find a word for the same queries, at the same distance
+    disagree = sum(1 for q, o, n in zip(queries, oldResults, newResults)
+                   if bool(o) != bool(n) or (o and distance(q, o, 2) != distance(q, n, 2)))
+    print("found:  old {}, new {}, different distance or found/not found: {}".format(
+        sum(map(bool, oldResults)), sum(map(bool, newResults)), disagree))
+
+    # The index must not miss any word within two typos
+    missed = 0
+    for q in queries[:50]:
+        expected = {w for w in words if distance(q.lower(), w, 2) <= 2}
+        if q.lower() in words:
+            expected = {q.lower()}
+        missed += len(expected - set(new.lookup(q)))
+    print("missed by the index compared to brute force (first 50 queries): {}".format(missed))
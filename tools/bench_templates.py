@@ -0,0 +1,87 @@
+"""Benchmark: repeated str.replace vs. compiled templates for rendering bot responses.
+
+Run from the repository root, e.g.:
+    python tools/bench_templates.py
+    python tools/bench_templates.py channels/mychannel/configs/responses.json
+
+Every message of the responses is rendered with a value for each placeholder it documents
+in its args_info, plus a few values it doesn't use, like the commands pass them.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from bot.paths import TEMPLATE_RESPONSES_PATH  # noqa: E402
+from bot.utilities.template import compileResponses  # noqa: E402
+
+UNUSED = {"<USER>": "SomeViewer", "<POINTS>": 1234, "<RANK>": "Legend 5"}
+
+
+def collect(responses, cases):
+    """Append (message, args) for every message with args_info to cases."""
+    if not isinstance(responses, dict):
+        return cases
+    if "msg" in responses:
+        msg = responses["msg"]
+        args_info = responses.get("args_info")
+        if isinstance(msg, str) and isinstance(args_info, dict) and args_info:
+            args = dict(UNUSED)
+            args.update({placeholder: "value{}".format(i) for i, placeholder in enumerate(args_info)})
+            cases.append((msg, args))
+    else:
+        for value in responses.values():
+            collect(value, cases)
+    return cases
+
+
+def replaceLoop(msg, args):
+    """Render the way replace_vars did before, without the error print."""
+    for key in args:
+        msg = msg.replace(key, str(args[key]))
+    return msg
+
+
+def replaceAll(cases, repetitions):
+    """Render all cases with replaceLoop()."""
+    for _ in range(repetitions):
+        for msg, args in cases:
+            replaceLoop(msg, args)
+
+
+def renderAll(cases, repetitions):
+    """Render all cases with their compiled templates."""
+    for _ in range(repetitions):
+        for template, args in cases:
+            template.render(args)
+
+
+def measure(name, function, cases, repetitions):
+    """Print renders/sec of function over all cases."""
+    start = time.perf_counter()
+    function(cases, repetitions)
+    elapsed = time.perf_counter() - start
+    print("{:<10} {:>12.0f} renders/sec".format(name, repetitions * len(cases) / elapsed))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark response rendering.")
+    parser.add_argument("responses", nargs="?", default=TEMPLATE_RESPONSES_PATH, help="responses.json to use")
+    parser.add_argument("-r", type=int, default=2000, help="Repetitions")
+    args = parser.parse_args()
+
+    with open(args.responses, encoding="utf-8") as file:
+        responses = json.load(file)
+    cases = collect(responses, [])
+    templates = compileResponses(responses)
+
+    # Both ways have to give the same messages, placeholders don't show up in the values here
+    for msg, values in cases:
+        assert templates[msg].render(values) == replaceLoop(msg, values), msg
+
+    print("{} messages".format(len(cases)))
+    measure("replace", replaceAll, cases, args.r)
+    measure("template", renderAll, [(templates[msg], values) for msg, values in cases], args.r)
@@ -0,0 +1,155 @@
+"""A fake Twitch IRC server for testing the IRC connections locally.
+
+Run from the repository root, e.g.:
+    python tools/fake_irc_server.py -p 6667 --chat 50 --drop 60
+    python monkalot.py -i localhost:6667 -n 2
+
+It accepts every login, answers joins, sends random chat messages into the joined channels
+and can drop all connections regularly, so reconnecting and rejoining can be watched. Joins
+which exceed Twitch's limit of 20 per 10 seconds per account and messages which exceed 20
+(100 with --moderator) per 30 seconds are logged as violations.
+"""
+import argparse
+import logging
+import os
+import random
+import sys
+from collections import defaultdict, deque
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from twisted.internet import protocol, reactor, task  # noqa: E402
+from twisted.protocols.basic import LineOnlyReceiver  # noqa: E402
+
+from bot.ircmanager import JOIN_LIMIT, JOIN_PERIOD  # noqa: E402
+from bot.utilities.outbound import LIMIT_PERIOD, MODERATOR_LIMIT, USER_LIMIT  # noqa: E402
+
+HOST = "tmi.twitch.tv"
+PRIVMSG = ("@badges=;color=;display-name=Viewer{0};emotes=;mod=0;subscriber=0;user-id={0};user-type= "
+           ":viewer{0}!viewer{0}@viewer{0}.tmi.twitch.tv PRIVMSG {1} :{2}")
+MESSAGES = ["Kappa", "LUL LUL LUL", "PogChamp Kappa", "monkaS", "4Head"]
+
+
+class FakeTwitchIRC(LineOnlyReceiver):
+    """One client connection."""
+
+    delimiter = b'\r\n'
+
+    def connectionMade(self):
+        """Initialize variables."""
+        self.nickname = None
+        self.channels = set()
+        self.factory.clients.add(self)
+
+    def connectionLost(self, reason):
+        """Forget the connection."""
+        self.factory.clients.discard(self)
+        logging.warning("{} disconnected, had {} channels".format(self.nickname, len(self.channels)))
+
+    def send(self, line):
+        """Send a line as text."""
+        self.sendLine(line.encode('utf-8'))
+
+    def lineReceived(self, line):
+        """Answer the commands the bot uses."""
+        command, _, rest = line.decode('utf-8').partition(' ')
+        command = command.upper()
+        if command == "NICK":
+            self.nickname = rest.strip()
+            self.send(":{} 001 {} :Welcome, GLHF!".format(HOST, self.nickname))
+            self.send(":{} 376 {} :>".format(HOST, self.nickname))
+            logging.warning("{} signed on".format(self.nickname))
+        elif command == "JOIN":
+            for channel in rest.split(','):
+                self.join(channel.strip())
+        elif command == "PART":
+            self.channels.discard(rest.strip())
+        elif command == "PRIVMSG":
+            self.privmsg(rest)
+        elif command == "PING":
+            self.send(":{} PONG {}".format(HOST, rest))
+
+    def join(self, channel):
+        """Join channel and check the join limit of the account."""
+        now = reactor.seconds()
+        joins = self.factory.joins[self.nickname]
+        while joins and now - joins[0] >= JOIN_PERIOD:
+            joins.popleft()
+        joins.append(now)
+        if len(joins) > JOIN_LIMIT:
+            self.factory.violations += 1
+            logging.error("{} exceeded the join limit: {} joins in {}s".format(self.nickname, len(joins), JOIN_PERIOD))
+
+        self.channels.add(channel)
+        self.factory.joined += 1
+        self.send(":{0}!{0}@{0}.{1} JOIN {2}".format(self.nickname, HOST, channel))
+        self.send("@badges=;color=;display-name={};emote-sets=0;mod={:d};subscriber=0;user-type= :{} USERSTATE {}".format(
+            self.nickname, self.factory.moderator, HOST, channel))
+
+    def privmsg(self, rest):
+        """Count a message and check the message limit of the account."""
+        channel, _, msg = rest.partition(' :')
+        now = reactor.seconds()
+        messages = self.factory.messages[self.nickname]
+        while messages and now - messages[0] >= LIMIT_PERIOD:
+            messages.popleft()
+        messages.append(now)
+        limit = MODERATOR_LIMIT if self.factory.moderator else USER_LIMIT
+        if len(messages) > limit:
+            self.factory.violations += 1
+            logging.error("{} exceeded the message limit: {} messages in {}s".format(self.nickname, len(messages), LIMIT_PERIOD))
+        self.factory.received.append((now, self.nickname, channel, msg))
+
+
+class FakeTwitchIRCFactory(protocol.ServerFactory):
+    """Keeps track of all connections."""
+
+    protocol = FakeTwitchIRC
+
+    def __init__(self, moderator=False):
+        """Initialize variables."""
+        self.moderator = moderator
+        self.clients = set()
+        self.joins = defaultdict(deque)     # account -> times of its recent joins
+        self.messages = defaultdict(deque)  # account -> times of its recent messages
+        self.received = []                  # (time, account, channel, message)
+        self.joined = 0
+        self.violations = 0
+
+    def chat(self, count):
+        """Send count messages into random joined channels."""
+        targets = [(c, channel) for c in self.clients for channel in c.channels]
+        for _ in range(count if targets else 0):
+            client, channel = random.choice(targets)
+            client.send(PRIVMSG.format(random.randint(1, 1000), channel, random.choice(MESSAGES)))
+
+    def drop(self):
+        """Drop all connections."""
+        logging.warning("Dropping {} connections".format(len(self.clients)))
+        for client in list(self.clients):
+            client.transport.loseConnection()
+
+    def report(self):
+        """Log the state of the server."""
+        channels = sum(len(c.channels) for c in self.clients)
+        logging.warning("{} connections, {} channels, {} joins, {} messages, {} limit violations".format(
+            len(self.clients), channels, self.joined, len(self.received), self.violations))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-p", type=int, default=6667, help="Port to listen on.")
+    parser.add_argument("--chat", type=int, default=0, help="Chat messages per second, spread over all channels.")
+    parser.add_argument("--drop", type=float, default=0, help="Drop all connections every DROP seconds.")
+    parser.add_argument("--moderator", action="store_true", help="Make every account a moderator in its channels.")
+    args = parser.parse_args()
+
+    logging.basicConfig(format="%(asctime)s %(message)s", level=logging.WARNING)
+    factory = FakeTwitchIRCFactory(args.moderator)
+    reactor.listenTCP(args.p, factory)
+    if args.chat:
+        task.LoopingCall(factory.chat, args.chat).start(1, now=False)
+    if args.drop:
+        task.LoopingCall(factory.drop).start(args.drop, now=False)
+    task.LoopingCall(factory.report).start(10, now=False)
+    reactor.run()
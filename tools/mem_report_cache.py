@@ -0,0 +1,114 @@
+"""Memory report: one WebCache per bot vs. one shared WebCache with a namespace per bot.
+
+Run from the repository root, e.g.:
+    python tools/mem_report_cache.py -n 50
+
+Every bot asks for the same urls TwitchBot does (global twitch/bttv emotes, Hearthstone cards,
+emojis and the channel bttv/ffz emotes). No network is used: every load returns a freshly
+parsed copy of a sample payload, like a real download would. Payloads from the disk cache
+(data/common_api_json_data) are used as samples if they exist, else synthetic ones of similar size.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from bot.paths import (CHANNEL_BTTVEMOTES_API, EMOJI_API, FFZ_API, GLOBAL_BTTVEMOTES_API,  # noqa: E402
+                       HEARTHSTONE_CARD_API, TWITCH_EMOTE_API)
+from bot.utilities.diskcache import DiskCache  # noqa: E402
+from bot.utilities.webcache import WebCache  # noqa: E402
+
+GLOBAL_URLS = [TWITCH_EMOTE_API, GLOBAL_BTTVEMOTES_API, HEARTHSTONE_CARD_API, EMOJI_API]
+
+
+def syntheticPayload(url):
+    """Return a json string shaped like the answer of url."""
+    if url == HEARTHSTONE_CARD_API:
+        cards = [{"id": "CARD_{}".format(i), "dbfId": i, "name": "Card name {}".format(i), "cost": i % 10,
+                  "text": "Some card text which is about this long {}".format(i), "type": "MINION",
+                  "rarity": "COMMON", "set": "CORE", "mechanics": ["BATTLECRY"]} for i in range(3000)]
+        return json.dumps(cards)
+    if url == EMOJI_API:
+        return json.dumps([{"emoji": chr(0x1F600 + i % 80), "description": "emoji {}".format(i),
+                            "aliases": ["emoji_{}".format(i)], "tags": []} for i in range(1800)])
+    if url == TWITCH_EMOTE_API:
+        return json.dumps({"emoticon_sets": {"0": [{"code": "Emote{}".format(i), "id": i} for i in range(250)]}})
+    return json.dumps({"emotes": [{"code": "BTTV{}".format(i), "id": str(i)} for i in range(100)],
+                       "room": {"set": 1}, "sets": {"1": {"emoticons": [{"name": "FFZ{}".format(i)} for i in range(50)]}}})
+
+
+def samplePayload(url):
+    """Return a stored payload of url as json string, or a synthetic one."""
+    stored = DiskCache().get(url)
+    if stored is not None:
+        return json.dumps(stored[0])
+    return syntheticPayload(url)
+
+
+def urlsOf(channel):
+    """Return the urls a bot of channel uses."""
+    return GLOBAL_URLS + [CHANNEL_BTTVEMOTES_API.format(channel), FFZ_API.format(channel)]
+
+
+def offlineCache(payloads, cache):
+    """Make cache load the sample payloads instead of downloading them."""
+    def loadJSON(url, validators=None):
+        # Channel specific urls all get the same sample
+        return json.loads(payloads.get(url, payloads["channel"])), None
+    cache.loadJSON = loadJSON
+    return cache
+
+
+def perBot(payloads, channels):
+    """Build one cache per bot, like before."""
+    caches = []
+    for channel in channels:
+        cache = offlineCache(payloads, WebCache(disk=None))
+        for url in urlsOf(channel):
+            cache.get(url, fallback=[])
+        caches.append(cache)
+    return caches
+
+
+def sharedCache(payloads, channels):
+    """Build one shared cache with a namespace per bot."""
+    cache = offlineCache(payloads, WebCache(disk=None))
+    namespaces = []
+    for channel in channels:
+        namespace = cache.namespace(channel)
+        for url in urlsOf(channel):
+            namespace.get(url, fallback=[])
+        namespaces.append(namespace)
+    return cache, namespaces
+
+
+def measure(name, function, *args):
+    """Print the memory still allocated after function returned, and its runtime."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = function(*args)
+    elapsed = time.perf_counter() - start
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print("{:<10} {:>10.1f} MiB  {:>8.2f} s".format(name, current / 2**20, elapsed))
+    del result
+    return current
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare memory of per-bot and shared web caches.")
+    parser.add_argument("-n", type=int, default=50, help="Number of channels")
+    args = parser.parse_args()
+
+    payloads = {url: samplePayload(url) for url in GLOBAL_URLS}
+    payloads["channel"] = syntheticPayload(CHANNEL_BTTVEMOTES_API)
+    channels = ["channel{}".format(i) for i in range(args.n)]
+
+    print("{} channels".format(args.n))
+    before = measure("per bot", perBot, payloads, channels)
+    after = measure("shared", sharedCache, payloads, channels)
+    print("saved {:.1f} MiB ({:.0f}%)".format((before - after) / 2**20, 100 * (before - after) / before))
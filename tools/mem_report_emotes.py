@@ -0,0 +1,88 @@
+"""Memory report: emote lists and emote indices of many bots.
+
+Run from the repository root, e.g.:
+    python tools/mem_report_emotes.py -n 50
+    python tools/mem_report_emotes.py -n 50 --baseline
+
+Every bot loads the emote lists TwitchBot does into one shared web cache and builds its
+EmoteIndex with TwitchBot.getEmoteIndex(). No network is used: every load returns a freshly
+parsed copy of a sample payload, channels share most of their bttv/ffz emotes like popular
+ones do. The memory still allocated afterwards is reported, in total and per bot.
+
+With --baseline every bot builds the index the way it was built before the shared vocabulary:
+frozensets of the names in its lists and a name -> source dict.
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from mem_report_cache import offlineCache, samplePayload, syntheticPayload  # noqa: E402
+
+from bot.bot import TwitchBot  # noqa: E402
+from bot.paths import CHANNEL_BTTVEMOTES_API, EMOJI_API, GLOBAL_BTTVEMOTES_API, TWITCH_EMOTE_API  # noqa: E402
+from bot.utilities.emoteindex import EmoteSource  # noqa: E402
+from bot.utilities.webcache import WebCache  # noqa: E402
+
+
+class BaselineIndex(object):
+    """The emote index before the shared vocabulary, only used for comparison."""
+
+    def __init__(self, twitch, bttv, ffz, emojis):
+        """Build the index from lists of emote names."""
+        self.twitch = frozenset(twitch)
+        self.bttv = frozenset(bttv)
+        self.ffz = frozenset(ffz)
+        self.emojis = frozenset(emojis)
+        self.emotes = self.twitch | self.bttv | self.ffz
+        self.nonTwitchEmotes = self.bttv | self.ffz
+
+        # Later sources overwrite earlier ones, twitch emotes win on name clashes
+        self.sources = {}
+        for source, names in [(EmoteSource.EMOJI, self.emojis), (EmoteSource.FFZ, self.ffz),
+                              (EmoteSource.BTTV, self.bttv), (EmoteSource.TWITCH, self.twitch)]:
+            for name in names:
+                self.sources[name] = source
+
+
+def createBots(payloads, channels, baseline=False):
+    """Return bots which only have what getEmoteIndex() needs, with their index built."""
+    cache = offlineCache(payloads, WebCache(disk=None))
+    bots = []
+    for channel in channels:
+        b = TwitchBot.__new__(TwitchBot)
+        b.channel = "#" + channel
+        b.cache = cache.namespace(channel)
+        b.emoteIndex = None
+        if baseline:
+            b.emoteIndex = BaselineIndex(b.getGlobalTwitchEmotes(), b.getChannelBTTVEmotes() + b.getGlobalBttvEmotes(),
+                                         b.getChannelFFZEmotes(), b.getEmojis())
+        else:
+            b.getEmoteIndex()
+        bots.append(b)
+    return cache, bots
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure the memory of the emote indices of many bots.")
+    parser.add_argument("-n", type=int, default=50, help="Number of channels")
+    parser.add_argument("--baseline", action="store_true", help="Build the indices like before the shared vocabulary")
+    args = parser.parse_args()
+
+    payloads = {url: samplePayload(url) for url in [TWITCH_EMOTE_API, GLOBAL_BTTVEMOTES_API, EMOJI_API]}
+    payloads["channel"] = syntheticPayload(CHANNEL_BTTVEMOTES_API)
+    channels = ["channel{}".format(i) for i in range(args.n)]
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = createBots(payloads, channels, args.baseline)
+    elapsed = time.perf_counter() - start
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    index = result[1][0].emoteIndex
+    print("{} channels, {} emotes and {} emojis per channel".format(args.n, len(index.emotes), len(index.emojis)))
+    print("total {:.2f} MiB, {:.1f} KiB per bot, {:.2f} s".format(current / 2**20, current / 1024 / args.n, elapsed))